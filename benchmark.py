@@ -0,0 +1,285 @@
+"""
+AIPathFinder benchmarks (headless, no matplotlib).
+
+Usage:
+    python benchmark.py ucs-frontier [--size 1000] [--repeat 3]
+    python benchmark.py bfs-vectorize [--sizes 256,1024] [--layouts corridor,maze,open]
+                                      [--repeat 3] [--tolerance 0.25]
+    python benchmark.py suite [--sizes 8,64,256,1024] [--layouts random,maze,open,corridor]
+                              [--densities 0.1,0.3] [--algorithms bfs,dfs,...]
+                              [--seed 0] [--repeat 3] [--json out.json]
+                              [--baseline old.json] [--tolerance 0.25]
+    python benchmark.py compare old.json new.json [--tolerance 0.25]
+
+ucs-frontier compares the bucket queue and heapq frontiers of UCS on an
+open size x size grid, searching corner to corner.
+
+bfs-vectorize times BFS with the automatic choice between the NumPy and the
+plain queue expansion against the plain queue alone.  The serpentine
+corridor is the case to watch: its levels are one cell wide.  It exits
+with status 1 if the automatic choice is slower by more than the
+tolerance anywhere.
+
+suite runs every algorithm over seeded grids (see grid_generators) and
+records, per case, the best wall time of ``--repeat`` warm runs, the
+search counters of one ``stats=SearchStats()`` run (nodes expanded and
+generated, largest frontier), the peak traced memory of a cold run (tracemalloc, so it
+includes first-use tables such as the neighbour table) and the path
+length.  ``--full`` uses every power of two from 8 to 4096.
+
+compare (or ``suite --baseline``) flags cases that got slower or bigger
+by more than the tolerance, expanded more nodes, or changed path length,
+and exits with status 1 if there are any.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import numpy as np  # type: ignore
+
+from grid_env import Grid
+from grid_generators import GENERATORS, make_grid
+from pathfinder import ALGORITHMS, find_path
+from search_stats import SearchStats
+from search_ucs import ucs
+
+SUITE_ALGORITHMS = ("bfs", "dfs", "ucs", "dls", "iddfs", "bidirectional")
+FULL_SIZES = tuple(2 ** k for k in range(3, 13))  # 8 .. 4096
+
+# timings below this many seconds are noise, never a regression
+TIME_FLOOR = 0.005
+
+
+def bench_ucs_frontier(size: int, repeat: int) -> None:
+    grid = Grid.from_array(np.zeros((size, size), dtype=int), (0, 0), (size - 1, size - 1))
+    grid.adjacency()  # build the neighbour table outside the timings
+
+    print(f"UCS on an open {size}x{size} grid ({size * size:,} cells)")
+    for frontier in ("heap", "bucket"):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            path = ucs(grid, frontier=frontier)
+            best = min(best, time.perf_counter() - t0)
+        print(f"  {frontier:<6} {best:8.3f} s   path length {len(path)}")
+
+
+def bench_bfs_vectorize(sizes: List[int], layouts: List[str], repeat: int,
+                        tolerance: float) -> List[str]:
+    """Automatic vs scalar BFS per layout; the cases where automatic lost."""
+    slower = []
+    for size in sizes:
+        for layout in layouts:
+            grid = make_grid(layout, size, 0.0, 0)
+            grid.adjacency()
+            best = {}
+            for vectorize in (False, None):
+                best[vectorize] = float("inf")
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    find_path(grid, "bfs", vectorize=vectorize)
+                    best[vectorize] = min(best[vectorize], time.perf_counter() - t0)
+            name = f"bfs {layout} {size}"
+            print(f"{name:<24} auto {best[None]:8.4f} s   scalar {best[False]:8.4f} s", flush=True)
+            if best[None] > best[False] * (1 + tolerance) and best[None] - best[False] > TIME_FLOOR:
+                slower.append(f"{name}: auto {best[None]:.4f} s, scalar {best[False]:.4f} s")
+    return slower
+
+
+def run_case(algorithm: str, layout: str, size: int, density: float, seed: int,
+             repeat: int, params: Dict) -> Dict:
+    """Benchmark one algorithm on one generated grid."""
+    # cold run under tracemalloc on a fresh grid, for peak memory
+    grid = make_grid(layout, size, density, seed)
+    if not grid.components().connected(grid.start, grid.end):
+        # every search would stop at the component check and time nothing
+        raise RuntimeError(f"{layout} {size} (seed {seed}) has no path from start to end")
+    tracemalloc.start()
+    path = find_path(grid, algorithm, **params)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # untimed run with counters, which are off in the timed runs
+    stats = SearchStats()
+    find_path(grid, algorithm, stats=stats, **params)
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        find_path(grid, algorithm, **params)
+        times.append(time.perf_counter() - t0)
+
+    return {
+        "algorithm": algorithm,
+        "layout": layout,
+        "size": size,
+        "density": density if layout == "random" else None,
+        "seed": seed,
+        "time_s": min(times),
+        "times_s": times,
+        "expanded": stats.expanded,
+        "generated": stats.generated,
+        "max_frontier": stats.max_frontier,
+        "peak_bytes": peak,
+        "path_length": len(path) - 1 if path else None,
+    }
+
+
+def run_suite(args) -> Dict:
+    params = {
+        "dls": {"depth_limit": args.max_depth},
+        "iddfs": {"max_depth": args.max_depth},
+    }
+    sizes = FULL_SIZES if args.full else args.sizes
+    results = []
+    for size in sizes:
+        for layout in args.layouts:
+            densities = args.densities if layout == "random" else [0.0]
+            for density in densities:
+                for algorithm in args.algorithms:
+                    result = run_case(algorithm, layout, size, density, args.seed,
+                                      args.repeat, params.get(algorithm, {}))
+                    results.append(result)
+                    _print_result(result)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+            "max_depth": args.max_depth,
+        },
+        "results": results,
+    }
+
+
+def _case_key(result: Dict):
+    return (result["algorithm"], result["layout"], result["size"],
+            result["density"], result["seed"])
+
+
+def _case_name(result: Dict) -> str:
+    density = f" d={result['density']}" if result["density"] is not None else ""
+    return f"{result['algorithm']} {result['layout']}{density} {result['size']}"
+
+
+def _print_result(result: Dict) -> None:
+    length = result["path_length"]
+    print(
+        f"{_case_name(result):<36} {result['time_s']:9.4f} s"
+        f" {result['expanded']:>10,} expanded {result['peak_bytes'] / 1e6:9.2f} MB"
+        f"  path {length if length is not None else '-'}",
+        flush=True,
+    )
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """Regressions of ``current`` against ``baseline`` as readable lines."""
+    old = {_case_key(r): r for r in baseline["results"]}
+    regressions = []
+    for new in current["results"]:
+        ref = old.get(_case_key(new))
+        if ref is None:
+            continue
+        name = _case_name(new)
+        if new["time_s"] > ref["time_s"] * (1 + tolerance) and new["time_s"] - ref["time_s"] > TIME_FLOOR:
+            regressions.append(f"{name}: time {ref['time_s']:.4f} -> {new['time_s']:.4f} s")
+        if new["peak_bytes"] > ref["peak_bytes"] * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {ref['peak_bytes']:,} -> {new['peak_bytes']:,} B")
+        if new["expanded"] > ref["expanded"]:
+            regressions.append(f"{name}: expanded {ref['expanded']:,} -> {new['expanded']:,}")
+        if new["path_length"] != ref["path_length"]:
+            regressions.append(f"{name}: path length {ref['path_length']} -> {new['path_length']}")
+    return regressions
+
+
+def _report(regressions: List[str]) -> int:
+    if not regressions:
+        print("no regressions")
+        return 0
+    print(f"{len(regressions)} regression(s):")
+    for line in regressions:
+        print("  " + line)
+    return 1
+
+
+def _csv(kind):
+    return lambda text: [kind(item) for item in text.split(",") if item]
+
+
+def main() -> Optional[int]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="benchmark", required=True)
+
+    frontier = commands.add_parser("ucs-frontier", help="UCS bucket queue vs heap")
+    frontier.add_argument("--size", type=int, default=1000)
+    frontier.add_argument("--repeat", type=int, default=3)
+
+    levels = commands.add_parser("bfs-vectorize", help="automatic vs scalar BFS expansion")
+    levels.add_argument("--sizes", type=_csv(int), default=[256, 1024])
+    levels.add_argument("--layouts", type=_csv(str), default=["corridor", "maze", "open"])
+    levels.add_argument("--repeat", type=int, default=3)
+    levels.add_argument("--tolerance", type=float, default=0.25)
+
+    suite = commands.add_parser("suite", help="all algorithms over generated grids")
+    suite.add_argument("--sizes", type=_csv(int), default=[8, 64, 256, 1024])
+    suite.add_argument("--full", action="store_true", help="sizes 8, 16, ..., 4096")
+    suite.add_argument("--layouts", type=_csv(str), default=list(GENERATORS))
+    suite.add_argument("--densities", type=_csv(float), default=[0.1, 0.3])
+    suite.add_argument("--algorithms", type=_csv(str), default=list(SUITE_ALGORITHMS))
+    suite.add_argument("--max-depth", type=int, default=64, help="DLS / IDDFS depth limit")
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.add_argument("--json", help="write the results to this file")
+    suite.add_argument("--baseline", help="compare against this earlier --json file")
+    suite.add_argument("--tolerance", type=float, default=0.25)
+
+    diff = commands.add_parser("compare", help="compare two --json files")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    diff.add_argument("--tolerance", type=float, default=0.25)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "ucs-frontier":
+        bench_ucs_frontier(args.size, args.repeat)
+        return None
+
+    if args.benchmark == "bfs-vectorize":
+        for layout in args.layouts:
+            if layout not in GENERATORS:
+                parser.error(f"unknown layout {layout!r}")
+        return _report(bench_bfs_vectorize(args.sizes, args.layouts, args.repeat, args.tolerance))
+
+    if args.benchmark == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        return _report(compare(baseline, current, args.tolerance))
+
+    for layout in args.layouts:
+        if layout not in GENERATORS:
+            parser.error(f"unknown layout {layout!r}")
+    for algorithm in args.algorithms:
+        if algorithm not in ALGORITHMS:
+            parser.error(f"unknown algorithm {algorithm!r}")
+    report = run_suite(args)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return _report(compare(baseline, report, args.tolerance))
+    return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Connected-component labels for a Grid, so searches can reject an
+unreachable target in O(1) instead of flooding the whole reachable region.
+
+Grid.MOVES contains the reverse of every move, so "b is reachable from a"
+is symmetric and plain undirected components answer it exactly.
+
+Labels are computed with NumPy (union by hooking each edge onto the smaller
+root, then pointer jumping) and kept up to date cell by cell:
+
+- a wall removed merges the components around it;
+- a wall added can only split its own component, and only when its free
+  neighbours are not already adjacent to one another, so most edits cost
+  O(1) and the rest relabel that one component.
+
+Use ``grid.components()`` rather than building one directly; the grid
+keeps it in sync through ``walls_changed``.
+"""
+
+from typing import Iterable, Tuple
+
+import numpy as np  # type: ignore
+
+Node = Tuple[int, int]
+
+
+class ComponentIndex:
+    """Component label per cell (-1 for walls) of a Grid's free cells."""
+
+    def __init__(self, grid):
+        self.grid = grid
+        # Grid.MOVES sorted by angle: around a cell, each neighbour in this
+        # ring is one move away from the next (see _splits)
+        self._ring = sorted(grid.MOVES, key=lambda m: np.arctan2(m[1], -m[0]))
+        self.labels = _label(grid.free_mask())
+
+    def connected(self, a: Node, b: Node) -> bool:
+        """True when ``b`` can be reached from ``a`` (both must be free)."""
+        la = self.labels[a[0] * self.grid.cols + a[1]]
+        return la >= 0 and la == self.labels[b[0] * self.grid.cols + b[1]]
+
+    def component(self, node: Node) -> int:
+        """Label of ``node`` (the smallest cell id in its component), or -1."""
+        return int(self.labels[node[0] * self.grid.cols + node[1]])
+
+    @property
+    def count(self) -> int:
+        """Number of components."""
+        return int(np.count_nonzero(self.labels == np.arange(self.labels.size)))
+
+    def update(self, nodes: Iterable[Node]) -> None:
+        """Re-sync after the wall state of ``nodes`` changed."""
+        grid = self.grid
+        labels = self.labels
+        for r, c in nodes:
+            v = r * grid.cols + c
+            wall = not grid.is_free((r, c))
+            if wall and labels[v] >= 0:
+                old = labels[v]
+                labels[v] = -1
+                if self._splits(r, c):
+                    self._relabel(old)
+                elif old == v:
+                    # the cell carried its component's label
+                    self._relabel(old)
+            elif not wall and labels[v] < 0:
+                around = {labels[n] for n in self._free_neighbours(r, c)}
+                new = min(around | {v})
+                for old in around - {new}:
+                    labels[labels == old] = new
+                labels[v] = new
+
+    def _free_neighbours(self, r, c):
+        grid = self.grid
+        for dr, dc in self._ring:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < grid.rows and 0 <= nc < grid.cols:
+                n = nr * grid.cols + nc
+                if self.labels[n] >= 0:
+                    yield n
+
+    def _splits(self, r, c) -> bool:
+        """
+        Whether walling (r, c) may disconnect its neighbours: they stay
+        connected when the free ones form one unbroken arc of the ring.
+        """
+        grid = self.grid
+        free = []
+        for dr, dc in self._ring:
+            nr, nc = r + dr, c + dc
+            free.append(
+                0 <= nr < grid.rows
+                and 0 <= nc < grid.cols
+                and self.labels[nr * grid.cols + nc] >= 0
+            )
+        # count the starts of free arcs around the ring
+        arcs = sum(1 for i in range(len(free)) if free[i] and not free[i - 1])
+        return arcs > 1
+
+    def _relabel(self, old: int) -> None:
+        grid = self.grid
+        members = self.labels == old
+        if not members.any():
+            return
+        sub = _label(members.reshape(grid.rows, grid.cols))
+        self.labels[members] = sub[members]
+
+
+def _label(free: np.ndarray) -> np.ndarray:
+    """
+    Label the free cells of a (rows, cols) mask by connectivity under the
+    grid moves; each component gets its smallest cell id, walls get -1.
+    """
+    rows, cols = free.shape
+    ids = np.arange(rows * cols, dtype=np.int32).reshape(rows, cols)
+    src, dst = [], []
+    # one direction of every symmetric move pair is enough
+    for dr, dc in ((0, 1), (1, 0), (1, 1)):
+        both = free[: rows - dr, : cols - dc] & free[dr:, dc:]
+        src.append(ids[: rows - dr, : cols - dc][both])
+        dst.append(ids[dr:, dc:][both])
+    src = np.concatenate(src)
+    dst = np.concatenate(dst)
+
+    parent = ids.ravel().copy()
+    while True:
+        pu, pv = parent[src], parent[dst]
+        differ = pu != pv
+        if not differ.any():
+            break
+        # every parent is a root here and roots only hook onto smaller ones,
+        # so whichever duplicate write wins the forest stays acyclic
+        parent[np.maximum(pu, pv)[differ]] = np.minimum(pu, pv)[differ]
+        # pointer jumping, restricted to cells not yet pointing at a root
+        deep = np.flatnonzero(parent[parent] != parent)
+        while deep.size:
+            parent[deep] = parent[parent[deep]]
+            deep = deep[parent[parent[deep]] != parent[deep]]
+        src, dst = src[differ], dst[differ]
+
+    return np.where(free.ravel(), parent, -1)
@@ -1,5 +1,33 @@
+from collections import deque
+from typing import NamedTuple
+
 import numpy as np  # type: ignore
 
+from grid_components import ComponentIndex
+from search_utils import SearchState
+
+# versions kept in the change log behind ``Grid.changes_since``
+CHANGE_LOG = 1024
+
+# cells per block when building the neighbour table
+ADJACENCY_BLOCK = 1 << 18
+
+
+class StepCosts(NamedTuple):
+    """
+    Weighted-terrain view used by cost-aware searches.
+
+    Stepping from cell id ``u`` onto ``v`` costs ``cells[v]``, multiplied
+    by ``diagonal_cost`` when ``abs(v - u) == diagonal_step`` (the
+    (1, 1) / (-1, -1) moves).
+    """
+
+    cells: memoryview
+    diagonal_step: int
+    diagonal_cost: float
+    integral: bool  # every step cost is an int (bucket queue friendly)
+    max_step: float
+
 
 class Grid:
     """
@@ -13,6 +41,13 @@ class Grid:
     -  3: frontier (in open list)
     -  4: explored (already expanded)
     -  5: final path
+
+    A grid is either dense, holding one code per cell in ``grid``, or lean
+    (``from_bits`` / ``from_walls``), holding the walls as a packed bitset
+    in ``walls``.  On a lean grid ``grid`` is only an overlay for the
+    search marks, built on first use by an observer or the GUI; headless
+    searches read the bits.  ``visit_order`` is allocated on first use in
+    both modes.
     """
 
     EMPTY = 0
@@ -23,25 +58,143 @@ class Grid:
     EXPLORED = 4
     PATH = 5
 
+    # clockwise movement order, see ``neighbors``
+    MOVES = (
+        (-1, 0),   # up
+        (0, 1),    # right
+        (1, 0),    # bottom
+        (1, 1),    # bottom-right (main diagonal)
+        (0, -1),   # left
+        (-1, -1),  # top-left (main diagonal)
+    )
+
     def __init__(self, rows: int = 8, cols: int = 8):
-        self.rows = rows
-        self.cols = cols
-        self.grid = np.zeros((rows, cols), dtype=int)
-        
-        self.visit_order = np.full((rows, cols), -1, dtype=int)
+        # make a vertical wall in the middle
+        self._setup(
+            np.zeros((rows, cols), dtype=np.int8),
+            start=(3, 5),
+            end=(5, 1),
+            static_walls=[(i, 3) for i in range(1, 7)],
+        )
+        self.reset()
+
+    @classmethod
+    def from_array(cls, cells, start, end) -> "Grid":
+        """
+        Wrap an existing 2-D array of cell codes without copying it.
+        Walls are whatever cells hold WALL; the array is not reset, so
+        it can be shared read-only between headless searches.
+        """
+        grid = cls.__new__(cls)
+        grid._setup(cells, start=start, end=end, static_walls=[])
+        return grid
+
+    @classmethod
+    def from_bits(cls, bits, shape, start, end) -> "Grid":
+        """
+        Lean grid over a packed wall bitset, without copying it: bit ``v``
+        (``np.packbits`` order over row-major cell ids, no row padding) is
+        set for walls.  One bit per cell until an observer marks cells.
+        """
+        rows, cols = shape
+        bits = np.asarray(bits)
+        if bits.dtype != np.uint8 or bits.shape != ((rows * cols + 7) // 8,):
+            raise ValueError(f"expected {(rows * cols + 7) // 8} packed uint8 bytes for {rows}x{cols} cells")
+        grid = cls.__new__(cls)
+        grid._setup(None, start=start, end=end, static_walls=[], walls=bits, shape=shape)
+        return grid
+
+    @classmethod
+    def from_walls(cls, walls, start, end) -> "Grid":
+        """Lean grid (see ``from_bits``) from a 2-D boolean wall mask."""
+        walls = np.asarray(walls, dtype=bool)
+        return cls.from_bits(np.packbits(walls.ravel()), walls.shape, start, end)
+
+    def _setup(self, cells, start, end, static_walls, walls=None, shape=None) -> None:
+        self.rows, self.cols = cells.shape if cells is not None else shape
+        # dense grids: the cell codes; lean grids: the mark overlay or None
+        self._cells = cells
+        # lean grids: packed wall bits (see ``from_bits``), else None
+        self.walls = walls
+        self._wall_bytes = walls.data if walls is not None else None
+
+        self._visit_order = None  # see ``visit_order``
         self._visit_counter = 0
-    
+
         self.max_dynamic_walls: int | None = None
 
-    
-        self.start = (3, 5)
-        self.end = (5, 1)
+        self.start = start
+        self.end = end
 
-        # make a vertical wall in the middle
-        self.static_walls = [(i, 3) for i in range(1, 7)]
+        self.static_walls = static_walls
         self.dynamic_walls = set()
 
-        self.reset()
+        # optional traversal cost per cell, see ``set_costs``
+        self.costs = None
+        self.diagonal_cost = 1
+        # (costs, diagonal_cost, StepCosts) they were built from, see ``step_costs``
+        self._step_costs = None
+
+        # bumped whenever the walls change; see ``walls_changed``
+        self.version = 0
+        # (version, changed cells or None if unknown) per bump, see ``changes_since``
+        self._changes = deque(maxlen=CHANGE_LOG)
+        self._adjacency = None
+        self._reverse_adjacency = None
+        self._components = None
+        self._search_states = {}
+
+        # cells written by set_mark / mark_visit since the last clear
+        self._touched = []
+
+    @property
+    def lean(self) -> bool:
+        """Whether the walls live in a packed bitset (see ``from_bits``)."""
+        return self.walls is not None
+
+    @property
+    def grid(self):
+        """
+        Cell codes as a 2-D array.  On a lean grid this is the mark
+        overlay, created from the wall bits the first time it is used.
+        """
+        if self._cells is None:
+            self._cells = np.where(self.free_mask(), self.EMPTY, self.WALL).astype(np.int8)
+        return self._cells
+
+    @grid.setter
+    def grid(self, cells) -> None:
+        self._cells = cells
+
+    @property
+    def visit_order(self):
+        """Visit label per cell (-1 = not visited), allocated on first use."""
+        if self._visit_order is None:
+            self._visit_order = np.full((self.rows, self.cols), -1, dtype=np.int32)
+        return self._visit_order
+
+    @visit_order.setter
+    def visit_order(self, labels) -> None:
+        self._visit_order = labels
+
+    def view(self) -> "Grid":
+        """
+        Grid over the same walls, costs, neighbour tables and component
+        index (shared, not copied) with its own start, end and search
+        state, e.g. one per thread.  Meant for headless searches: do not
+        edit walls through a view, and make a new one after editing this
+        grid.
+        """
+        if self.lean:
+            view = Grid.from_bits(self.walls, (self.rows, self.cols), self.start, self.end)
+        else:
+            view = Grid.from_array(self.grid, self.start, self.end)
+        view.costs, view.diagonal_cost = self.costs, self.diagonal_cost
+        view._step_costs = self._step_costs
+        view._adjacency = self.adjacency()
+        view._reverse_adjacency = self._reverse_adjacency
+        view._components = self.components()
+        return view
 
     # ------------------------------------------------------------------
     # basic helpers
@@ -49,11 +202,22 @@ class Grid:
     def reset(self) -> None:
         """
         Reset all non-wall markings (frontier / explored / path) but keep
-        static walls and the current start/end positions.
+        static walls and the current start/end positions.  A lean grid
+        drops its overlay and visit labels instead.
         """
-        self.grid.fill(self.EMPTY)
-        self.visit_order.fill(-1)
         self._visit_counter = 0
+        self._touched.clear()
+        if self.lean:
+            self._cells = None
+            self._visit_order = None
+            for node in self.static_walls:
+                self._write_wall(node, True)
+            self.walls_changed()
+            return
+
+        self.grid[self.grid != self.WALL] = self.EMPTY
+        if self._visit_order is not None:
+            self._visit_order.fill(-1)
 
         # static walls
         for r, c in self.static_walls:
@@ -64,17 +228,27 @@ class Grid:
         er, ec = self.end
         self.grid[sr, sc] = self.START
         self.grid[er, ec] = self.END
+        self.walls_changed()
 
     def clear_search_marks(self) -> None:
-        """Remove FRONTIER / EXPLORED / PATH marks from the grid."""
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if self.grid[r, c] in (self.FRONTIER, self.EXPLORED, self.PATH):
-                    self.grid[r, c] = self.EMPTY
-                # clear any visit labels for next run
-                if self.visit_order[r, c] >= 0 and self.grid[r, c] == self.EMPTY:
-                    self.visit_order[r, c] = -1
-        
+        """
+        Remove FRONTIER / EXPLORED / PATH marks from the grid.
+
+        Only the cells recorded by ``set_mark`` / ``mark_visit`` since the
+        last clear are visited, so the cost is proportional to what the
+        previous search touched, not to the grid size.
+        """
+        if self._touched:
+            rows, cols = np.array(self._touched, dtype=np.int64).T
+            self._touched.clear()
+
+            cells = self.grid[rows, cols]
+            marked = np.isin(cells, (self.FRONTIER, self.EXPLORED, self.PATH))
+            self.grid[rows[marked], cols[marked]] = self.EMPTY
+            # clear any visit labels for next run
+            empty = self.grid[rows, cols] == self.EMPTY
+            self.visit_order[rows[empty], cols[empty]] = -1
+
         sr, sc = self.start
         er, ec = self.end
         self.grid[sr, sc] = self.START
@@ -89,8 +263,24 @@ class Grid:
     def is_free(self, node) -> bool:
         """Walkable for the agent (explored/frontier/path are all walkable)."""
         r, c = node
+        if self._wall_bytes is not None:
+            v = r * self.cols + c
+            return not self._wall_bytes[v >> 3] >> (7 - (v & 7)) & 1
         # A cell is free if it is not a static wall
-        return self.grid[r, c] != self.WALL
+        return self._cells[r, c] != self.WALL
+
+    def is_free_id(self, v: int) -> bool:
+        """``is_free`` by cell id."""
+        if self._wall_bytes is not None:
+            return not self._wall_bytes[v >> 3] >> (7 - (v & 7)) & 1
+        return self._cells.item(v) != self.WALL
+
+    def free_mask(self) -> np.ndarray:
+        """Boolean (rows, cols) array, True on every non-wall cell."""
+        if self.walls is not None:
+            bits = np.unpackbits(self.walls, count=self.rows * self.cols)
+            return (bits == 0).reshape(self.rows, self.cols)
+        return self._cells != self.WALL
 
     def neighbors(self, node):
         """
@@ -105,21 +295,283 @@ class Grid:
 
         """
         r, c = node
-        moves = [
-            (-1, 0),   # up
-            (0, 1),    # right
-            (1, 0),    # bottom
-            (1, 1),    # bottom-right (main diagonal)
-            (0, -1),   # left
-            (-1, -1),  # top-left (main diagonal)
-        ]
-        for dr, dc in moves:
+        for dr, dc in self.MOVES:
             nr, nc = r + dr, c + dc
             nxt = (nr, nc)
             if self.in_bounds(nxt) and self.is_free(nxt):
                 yield nxt
 
-   
+    # ------------------------------------------------------------------
+    # walls and the precomputed neighbour table
+    # ------------------------------------------------------------------
+    def set_wall(self, node, wall: bool = True) -> None:
+        """Add (or remove) a static wall and invalidate the neighbour table."""
+        if wall:
+            if node not in self.static_walls:
+                self.static_walls.append(node)
+        elif node in self.static_walls:
+            self.static_walls.remove(node)
+        self._write_wall(node, wall)
+        self.walls_changed([node])
+
+    def _write_wall(self, node, wall: bool) -> None:
+        """Set or clear a wall in the bitset and / or the cell codes."""
+        r, c = node
+        if self.walls is not None:
+            v = r * self.cols + c
+            bit = 0x80 >> (v & 7)
+            byte = int(self.walls[v >> 3])
+            self.walls[v >> 3] = byte | bit if wall else byte & (0xFF ^ bit)
+        if self._cells is not None:
+            if wall:
+                self._cells[r, c] = self.WALL
+            elif self._cells[r, c] == self.WALL:
+                self._cells[r, c] = self.EMPTY
+
+    def add_dynamic_wall(self, node) -> None:
+        """
+        Drop a wall onto ``node`` at runtime (kept in ``dynamic_walls``).
+        Raises ValueError once ``max_dynamic_walls`` would be exceeded.
+        """
+        if node in (self.start, self.end):
+            raise ValueError("cannot place a wall on the start or target")
+        if (
+            self.max_dynamic_walls is not None
+            and node not in self.dynamic_walls
+            and len(self.dynamic_walls) >= self.max_dynamic_walls
+        ):
+            raise ValueError(f"at most {self.max_dynamic_walls} dynamic walls allowed")
+        self.dynamic_walls.add(node)
+        self._write_wall(node, True)
+        self.walls_changed([node])
+
+    def remove_dynamic_wall(self, node) -> None:
+        """Remove a wall previously added with ``add_dynamic_wall``."""
+        self.dynamic_walls.discard(node)
+        self._write_wall(node, False)
+        self.walls_changed([node])
+
+    def walls_changed(self, nodes=None) -> None:
+        """
+        Call after writing WALL codes into ``self.grid`` directly (lean
+        grids take wall edits through ``set_wall`` and the dynamic walls
+        only, since their overlay is not read back).
+        Bumps ``version`` so derived tables are rebuilt on next use.
+        Passing the changed ``nodes`` lets the component index update in
+        place instead of being rebuilt, and records them for
+        ``changes_since``.
+        """
+        if nodes is not None:
+            nodes = list(nodes)
+        self.version += 1
+        self._changes.append((self.version, nodes))
+        self._adjacency = None
+        self._reverse_adjacency = None
+        if self._components is not None:
+            if nodes is None:
+                self._components = None
+            else:
+                self._components.update(nodes)
+
+    def index(self, node) -> int:
+        """Integer cell id used by the search engines (row-major)."""
+        r, c = node
+        return r * self.cols + c
+
+    def node(self, index: int):
+        """Inverse of ``index``: cell id -> (row, col)."""
+        return divmod(index, self.cols)
+
+    def adjacency(self):
+        """
+        Neighbour table in CSR form: ``(offsets, targets)``.
+
+        The neighbours of cell id ``v`` are
+        ``targets[offsets[v]:offsets[v + 1]]`` in the same order as
+        ``neighbors``.  Both are memoryviews over compact NumPy integer
+        arrays, so indexing them gives plain Python ints.  The table is
+        built once and reused until the walls change.
+        """
+        if self._adjacency is None:
+            self._adjacency = self._build_adjacency()
+        return self._adjacency
+
+    # ------------------------------------------------------------------
+    # weighted terrain
+    # ------------------------------------------------------------------
+    def components(self) -> ComponentIndex:
+        """
+        Connected-component index of the free cells, built on first use and
+        kept in sync by ``walls_changed``.  ``components().connected(a, b)``
+        answers reachability in O(1).
+        """
+        if self._components is None:
+            self._components = ComponentIndex(self)
+        return self._components
+
+    def set_costs(self, costs=None, diagonal_cost=1) -> None:
+        """
+        Give every cell a traversal cost (the cost of stepping onto it).
+
+        Integer costs are stored as uint16 and anything else as float32, so
+        the layer stays small on big maps; all costs must be positive.
+        ``diagonal_cost`` multiplies the cost of the diagonal moves.
+        ``costs=None`` restores unit costs.
+        """
+        if costs is None and diagonal_cost != 1:
+            costs = np.ones((self.rows, self.cols), dtype=np.uint16)
+        if costs is not None:
+            costs = np.asarray(costs)
+            if costs.shape != (self.rows, self.cols):
+                raise ValueError(
+                    f"cost layer shape {costs.shape} does not match grid "
+                    f"{(self.rows, self.cols)}"
+                )
+            if not (costs > 0).all():
+                raise ValueError("traversal costs must be positive")
+            if costs.dtype.kind in "iu" and costs.max() <= np.iinfo(np.uint16).max:
+                costs = np.ascontiguousarray(costs, dtype=np.uint16)
+            else:
+                costs = np.ascontiguousarray(costs, dtype=np.float32)
+        if diagonal_cost <= 0:
+            raise ValueError("diagonal_cost must be positive")
+
+        self.costs = costs
+        self.diagonal_cost = diagonal_cost
+        self._step_costs = None
+        self.step_costs()  # the layer was just read anyway; scan it for max_step now
+        self.version += 1
+        self._changes.append((self.version, None))
+
+    def changes_since(self, version: int):
+        """
+        Cells whose walls changed after ``version`` (possibly repeated), or
+        None when that is not known: the costs changed, ``walls_changed``
+        was called without cells, or the version is older than the last
+        CHANGE_LOG changes.
+        """
+        if version == self.version:
+            return []
+        log = self._changes
+        if not log or log[0][0] > version + 1:
+            return None
+        cells = []
+        for changed, nodes in log:
+            if changed > version:
+                if nodes is None:
+                    return None
+                cells.extend(nodes)
+        return cells
+
+    def step_costs(self):
+        """
+        StepCosts for the current cost layer, or None with unit costs.
+        Built once per layer (set_costs builds it), since ``max_step``
+        needs a pass over every cell.
+        """
+        if self.costs is None:
+            return None
+        cells = self.costs
+        cached = self._step_costs
+        if cached is not None and cached[0] is cells and cached[1] == self.diagonal_cost:
+            return cached[2]
+
+        integral = cells.dtype.kind == "u" and float(self.diagonal_cost).is_integer()
+        diagonal_cost = int(self.diagonal_cost) if integral else float(self.diagonal_cost)
+        max_step = cells.max().item() * max(1, diagonal_cost)
+        weights = StepCosts(
+            cells.reshape(-1).data,
+            self.cols + 1,
+            diagonal_cost,
+            integral,
+            max_step,
+        )
+        self._step_costs = (cells, self.diagonal_cost, weights)
+        return weights
+
+    def move_distance(self, a, b) -> int:
+        """
+        Fewest moves from ``a`` to ``b`` ignoring walls (a lower bound on
+        any path).  With Grid.MOVES a diagonal step covers one row and
+        one column only when both change in the same direction.
+        """
+        dr, dc = b[0] - a[0], b[1] - a[1]
+        if (dr >= 0) == (dc >= 0):
+            return max(abs(dr), abs(dc))
+        return abs(dr) + abs(dc)
+
+    def search_state(self, slot: int = 0) -> SearchState:
+        """
+        Reusable SearchState sized to this grid.  Searches that need two
+        independent states at once (bidirectional) use different slots.
+        """
+        size = self.rows * self.cols
+        state = self._search_states.get(slot)
+        if state is None or state.size != size:
+            state = self._search_states[slot] = SearchState(size)
+        return state
+
+    def reverse_adjacency(self):
+        """
+        CSR table of predecessors: ``sources[offsets[v]:offsets[v + 1]]``
+        are the cells with a move onto ``v``.  Backward searches use it so
+        they stay correct even for a move set that is not symmetric.
+        """
+        if self._reverse_adjacency is None:
+            offsets, targets = self.adjacency()
+            offsets = np.asarray(offsets)
+            targets = np.asarray(targets)
+            size = self.rows * self.cols
+
+            sources = np.repeat(np.arange(size, dtype=targets.dtype), np.diff(offsets))
+            order = np.argsort(targets, kind="stable")
+            reverse_offsets = np.zeros(size + 1, dtype=offsets.dtype)
+            np.cumsum(np.bincount(targets, minlength=size), out=reverse_offsets[1:])
+            self._reverse_adjacency = (reverse_offsets.data, sources[order].data)
+        return self._reverse_adjacency
+
+    def _build_adjacency(self):
+        rows, cols = self.rows, self.cols
+        free = self.free_mask()
+        n_moves = len(self.MOVES)
+        # cell ids and edge counts get int32 whenever they fit
+        dtype = np.int32 if rows * cols < 2**31 else np.int64
+        # rows per block: the dense per-block table stays small, so the peak
+        # is about the finished CSR (offsets plus targets) and no more
+        step = max(1, ADJACENCY_BLOCK // cols)
+        blocks = [(r0, min(r0 + step, rows)) for r0 in range(0, rows, step)]
+
+        def block(r0, r1):
+            # one column per move: target id, or -1 when out of bounds / wall
+            table = np.full((r1 - r0, cols, n_moves), -1, dtype=dtype)
+            col_ids = np.arange(cols, dtype=dtype)
+            for k, (dr, dc) in enumerate(self.MOVES):
+                lo, hi = max(r0, -dr), min(r1, rows - dr)  # sources with r + dr in bounds
+                if lo >= hi:
+                    continue
+                src_c = slice(max(0, -dc), cols - max(0, dc))
+                dst_c = slice(max(0, dc), cols - max(0, -dc))
+                ids = np.arange(lo + dr, hi + dr, dtype=dtype)[:, None] * cols + col_ids[dst_c]
+                table[lo - r0:hi - r0, src_c, k] = np.where(free[lo + dr:hi + dr, dst_c], ids, -1)
+            # walls have no moves either, or the reverse table would list them
+            # as predecessors of their free neighbours
+            table[~free[r0:r1]] = -1
+            return table.reshape(-1, n_moves)
+
+        counts = np.empty(rows * cols, dtype=np.int8)
+        for r0, r1 in blocks:
+            counts[r0 * cols:r1 * cols] = (block(r0, r1) >= 0).sum(axis=1)
+        total = int(counts.sum(dtype=np.int64))
+        offsets = np.zeros(rows * cols + 1, dtype=np.int32 if total < 2**31 else np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        del counts
+
+        targets = np.empty(int(offsets[-1]), dtype=dtype)
+        for r0, r1 in blocks:
+            table = block(r0, r1)
+            # row-major keeps move order
+            targets[offsets[r0 * cols]:offsets[r1 * cols]] = table[table >= 0]
+        return offsets.data, targets.data
 
     # ------------------------------------------------------------------
     # visit order helpers (for numeric labels in GUI)
@@ -130,5 +582,14 @@ class Grid:
         if self.visit_order[r, c] == -1:
             self.visit_order[r, c] = self._visit_counter
             self._visit_counter += 1
+            self._touched.append(node)
+
+    def set_mark(self, node, code: int) -> None:
+        """
+        Write a search mark (FRONTIER / EXPLORED / PATH) for ``node`` and
+        remember the cell for ``clear_search_marks``.
+        """
+        self.grid[node] = code
+        self._touched.append(node)
 
 
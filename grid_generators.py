@@ -0,0 +1,136 @@
+"""
+Seeded grid layouts for benchmarks and experiments (headless, NumPy only).
+
+Every generator takes ``(size, density, seed)`` and returns a square Grid
+whose end can be reached from its start; the same arguments always
+produce the same grid.  ``density`` only matters for the random layout.
+
+- random:   each cell is a wall with probability ``density``, then the
+            fewest walls that join start and end are cleared;
+- maze:     a binary-tree maze (rooms on even coordinates), start and end
+            in opposite corners;
+- open:     no walls at all;
+- corridor: one serpentine corridor through the whole grid, the worst
+            case for DFS / IDDFS (and a long path for everyone else).
+"""
+
+from collections import deque
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np  # type: ignore
+
+from grid_env import Grid
+
+
+def random_grid(size: int, density: float = 0.2, seed: int = 0) -> Grid:
+    rng = np.random.default_rng(seed)
+    cells = np.where(rng.random((size, size)) < density, Grid.WALL, Grid.EMPTY)
+    start, end = (0, 0), (size - 1, size - 1)
+    cells[start] = cells[end] = Grid.EMPTY
+    grid = Grid.from_array(cells.astype(np.int8), start, end)
+    _connect(grid)
+    return grid
+
+
+def _connect(grid: Grid) -> None:
+    """
+    Clear the fewest walls that join grid.start to grid.end, if they are
+    not connected yet.  A 0-1 BFS (free cells cost 0, walls 1) runs from
+    the endpoint in the smaller component until it reaches the other one,
+    so a walled-in corner costs a few cells, not a sweep of the grid.
+    """
+    labels = grid.components().labels
+    a, b = grid.index(grid.start), grid.index(grid.end)
+    if labels[a] == labels[b]:
+        return
+    if np.count_nonzero(labels == labels[a]) > np.count_nonzero(labels == labels[b]):
+        a, b = b, a
+    target = labels[b]
+
+    rows, cols = grid.rows, grid.cols
+    cost = {a: 0}
+    parent = {a: -1}
+    queue = deque([a])
+    while queue:
+        u = queue.popleft()
+        if labels[u] == target:
+            break
+        r, c = divmod(u, cols)
+        for dr, dc in Grid.MOVES:
+            nr, nc = r + dr, c + dc
+            if not (0 <= nr < rows and 0 <= nc < cols):
+                continue
+            v = nr * cols + nc
+            step = 0 if labels[v] >= 0 else 1
+            if v not in cost or cost[u] + step < cost[v]:
+                cost[v] = cost[u] + step
+                parent[v] = u
+                if step:
+                    queue.append(v)
+                else:
+                    queue.appendleft(v)
+
+    carved: List[Tuple[int, int]] = []
+    while u >= 0:
+        if labels[u] < 0:
+            carved.append(grid.node(u))
+            grid.grid[carved[-1]] = Grid.EMPTY
+        u = parent[u]
+    grid.walls_changed(carved)
+
+
+def maze_grid(size: int, density: float = 0.0, seed: int = 0) -> Grid:
+    rng = np.random.default_rng(seed)
+    cells = np.full((size, size), Grid.WALL, dtype=np.int8)
+    cells[::2, ::2] = Grid.EMPTY
+
+    # every room except (0, 0) opens north or west; the top row can only
+    # open west and the left column only north
+    rooms = cells[::2, ::2].shape
+    north = rng.random(rooms) < 0.5
+    north[0, :] = False
+    north[:, 0] = True
+    rr, rc = np.nonzero(np.ones(rooms, dtype=bool))
+    opens = (rr > 0) | (rc > 0)
+    rr, rc = rr[opens], rc[opens]
+    up = north[rr, rc]
+    cells[2 * rr[up] - 1, 2 * rc[up]] = Grid.EMPTY
+    cells[2 * rr[~up], 2 * rc[~up] - 1] = Grid.EMPTY
+
+    last = (size - 1) // 2 * 2
+    return Grid.from_array(cells, (0, 0), (last, last))
+
+
+def open_grid(size: int, density: float = 0.0, seed: int = 0) -> Grid:
+    cells = np.zeros((size, size), dtype=np.int8)
+    return Grid.from_array(cells, (0, 0), (size - 1, size - 1))
+
+
+def corridor_grid(size: int, density: float = 0.0, seed: int = 0) -> Grid:
+    cells = np.zeros((size, size), dtype=np.int8)
+    # wall rows 1, 3, 5, ... with the gap alternating between the ends
+    for k, r in enumerate(range(1, size, 2)):
+        cells[r, :] = Grid.WALL
+        cells[r, size - 1 if k % 2 == 0 else 0] = Grid.EMPTY
+
+    # the last corridor row is entered from one end; the goal is the other
+    k = (size - 1) // 2
+    end = (2 * k, 0 if k % 2 else size - 1)
+    return Grid.from_array(cells, (0, 0), end)
+
+
+GENERATORS: Dict[str, Callable[..., Grid]] = {
+    "random": random_grid,
+    "maze": maze_grid,
+    "open": open_grid,
+    "corridor": corridor_grid,
+}
+
+
+def make_grid(layout: str, size: int, density: float = 0.2, seed: int = 0) -> Grid:
+    """Build a grid by layout name (see GENERATORS)."""
+    try:
+        generator = GENERATORS[layout]
+    except KeyError:
+        raise ValueError(f"unknown layout {layout!r}; choose from {sorted(GENERATORS)}") from None
+    return generator(size, density, seed)
@@ -0,0 +1,193 @@
+"""
+Load and save grids (headless, NumPy only).
+
+Native format (``save_grid`` / ``load_grid``), little-endian:
+
+- a 64-byte header: magic ``b"APFGRID\\0"``, format version (u16), flags
+  (u16), rows, cols (u32), start row/col, end row/col (i32) and the
+  diagonal cost (f64);
+- the wall layer: one int8 cell code per cell (WALL or EMPTY), or with
+  the PACKED flag one bit per cell (set on walls) in row-major order,
+  the layout of ``Grid.walls``;
+- with COSTS_U16 / COSTS_F32, a cost layer of uint16 / float32 per cell,
+  starting at the next multiple of 8 bytes.
+
+``load_grid`` memory-maps the layers, so opening even a very large map
+only reads the header.  The int8 layer is mapped copy-on-write: searches
+can mark cells without touching the file, and processes that open the
+same map share its pages until they write.  A packed layer is 8x smaller
+and loads as a lean grid (see Grid.from_bits) straight over the mapped
+bits, so it is never unpacked.
+
+``load_movingai`` imports the text ``.map`` files of the MovingAI
+pathfinding benchmarks and ``read_scenarios`` their ``.scen`` query lists.
+"""
+
+import struct
+from typing import List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+from grid_env import Grid
+
+Node = Tuple[int, int]
+
+MAGIC = b"APFGRID\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIIiiiid")
+HEADER_SIZE = 64
+
+# header flags
+PACKED = 1
+COSTS_U16 = 2
+COSTS_F32 = 4
+
+# MovingAI terrain: passable ground and swamp; everything else ("@", "O",
+# "T" trees, "W" water) is a wall
+MOVINGAI_FREE = b".GS"
+
+
+def save_grid(grid: Grid, path: str, packed: bool = False) -> None:
+    """
+    Write the walls, the cost layer (if any) and start/end of ``grid``.
+    Search marks are not saved.
+    """
+    flags = PACKED if packed else 0
+    if grid.costs is not None:
+        flags |= COSTS_U16 if grid.costs.dtype == np.uint16 else COSTS_F32
+
+    header = HEADER.pack(
+        MAGIC, VERSION, flags, grid.rows, grid.cols,
+        *grid.start, *grid.end, float(grid.diagonal_cost),
+    )
+    with open(path, "wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        if packed and grid.lean:
+            layer = grid.walls
+        elif packed:
+            layer = np.packbits(~grid.free_mask().ravel())
+        else:
+            layer = np.where(grid.free_mask(), Grid.EMPTY, Grid.WALL).astype(np.int8)
+        layer.tofile(f)
+        if grid.costs is not None:
+            f.write(b"\0" * (-f.tell() % 8))
+            np.ascontiguousarray(grid.costs).tofile(f)
+
+
+def load_grid(path: str, mmap: bool = True, lean: Optional[bool] = None) -> Grid:
+    """
+    Open a grid written by ``save_grid``.  With ``mmap=False`` the layers
+    are read into memory instead of being mapped.  Packed files load as
+    lean grids and int8 files as dense ones unless ``lean`` says otherwise.
+    """
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE or raw[:8] != MAGIC:
+        raise ValueError(f"{path}: not a grid file")
+    _, version, flags, rows, cols, sr, sc, er, ec, diagonal_cost = HEADER.unpack_from(raw)
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported grid format version {version}")
+
+    def layer(offset: int, dtype, shape, mode: str) -> np.ndarray:
+        if mmap:
+            return np.memmap(path, dtype=dtype, mode=mode, offset=offset, shape=shape)
+        count = int(np.prod(shape))
+        return np.fromfile(path, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+    offset = HEADER_SIZE
+    start, end = (sr, sc), (er, ec)
+    if lean is None:
+        lean = bool(flags & PACKED)
+    if flags & PACKED:
+        size = (rows * cols + 7) // 8
+        bits = layer(offset, np.uint8, (size,), "c")
+        if lean:
+            grid = Grid.from_bits(bits, (rows, cols), start, end)
+        else:
+            walls = np.unpackbits(bits, count=rows * cols).reshape(rows, cols)
+            cells = np.where(walls.view(bool), Grid.WALL, Grid.EMPTY).astype(np.int8)
+            grid = Grid.from_array(cells, start, end)
+    else:
+        size = rows * cols
+        cells = layer(offset, np.int8, (rows, cols), "c")
+        if lean:
+            grid = Grid.from_walls(cells == Grid.WALL, start, end)
+        else:
+            grid = Grid.from_array(cells, start, end)
+    offset += size
+
+    if flags & (COSTS_U16 | COSTS_F32):
+        offset += -offset % 8
+        dtype = np.uint16 if flags & COSTS_U16 else np.float32
+        # already checked by set_costs before saving; assigning the layer
+        # directly keeps it unread until a search needs it
+        grid.costs = layer(offset, dtype, (rows, cols), "r")
+        grid.diagonal_cost = diagonal_cost
+    elif diagonal_cost != 1:
+        grid.set_costs(None, diagonal_cost)
+    return grid
+
+
+def load_movingai(
+    path: str, start: Optional[Node] = None, end: Optional[Node] = None, lean: bool = False
+) -> Grid:
+    """
+    Import a MovingAI ``.map`` file.  The format has no start or goal;
+    they default to the first and last free cell in row-major order.
+    ``lean=True`` returns a lean grid (see Grid.from_bits).
+    """
+    with open(path, "rb") as f:
+        lines = f.read().splitlines()
+
+    fields = {}
+    for i, line in enumerate(lines):
+        if line.strip() == b"map":
+            body = lines[i + 1:]
+            break
+        key, _, value = line.decode("ascii").partition(" ")
+        fields[key] = value.strip()
+    else:
+        raise ValueError(f"{path}: missing 'map' line")
+    try:
+        rows, cols = int(fields["height"]), int(fields["width"])
+    except (KeyError, ValueError):
+        raise ValueError(f"{path}: missing or invalid height / width") from None
+
+    body = [row.rstrip(b"\r") for row in body[:rows]]
+    if len(body) != rows or any(len(row) != cols for row in body):
+        raise ValueError(f"{path}: map body is not {rows} x {cols}")
+
+    terrain = np.frombuffer(b"".join(body), dtype=np.uint8).reshape(rows, cols)
+    free = np.isin(terrain, np.frombuffer(MOVINGAI_FREE, dtype=np.uint8))
+
+    if start is None or end is None:
+        free_ids = np.flatnonzero(free)
+        if len(free_ids) == 0:
+            raise ValueError(f"{path}: map has no free cell")
+        if start is None:
+            start = divmod(int(free_ids[0]), cols)
+        if end is None:
+            end = divmod(int(free_ids[-1]), cols)
+    for node in (start, end):
+        if not free[node]:
+            raise ValueError(f"{path}: {node} is not a free cell")
+    if lean:
+        return Grid.from_walls(~free, start, end)
+    return Grid.from_array(np.where(free, Grid.EMPTY, Grid.WALL).astype(np.int8), start, end)
+
+
+def read_scenarios(path: str) -> List[Tuple[Node, Node, float]]:
+    """
+    Queries of a MovingAI ``.scen`` file as ``(start, goal, optimal
+    length)`` with (row, col) nodes.  The lengths assume the benchmark's
+    octile moves, not Grid.MOVES.
+    """
+    queries = []
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 9 or parts[0] == "version":
+                continue
+            sx, sy, gx, gy = (int(v) for v in parts[4:8])
+            queries.append(((sy, sx), (gy, gx), float(parts[8])))
+    return queries
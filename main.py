@@ -6,14 +6,22 @@ Simple runner for the grid search visualisations.
 
 Usage (from this folder):
     python main.py
+    python main.py --serve [--map FILE] [--workers N] [--queue N] [--timeout S]
 
 You will be asked which uninformed search algorithm to run.
-The GUI window will then animate how the algorithm explores the grid
-and how the agent follows the path while reacting to dynamic walls.
+The search runs at full speed under a SearchRecorder; the GUI window
+then replays how the algorithm explored the grid and the final path.
+
+With ``--serve`` there is no prompt and no window: path queries are read
+as JSON lines from stdin and answered on stdout (see path_service).
 """
 
+import argparse
+
 from grid_env import Grid
-from view_gui import GridGUI
+from grid_io import load_grid, load_movingai
+from path_service import serve_stdin
+from search_recorder import SearchRecorder
 from search_bfs import bfs
 from search_dfs import dfs
 from search_ucs import ucs
@@ -36,7 +44,32 @@ def choose_algorithm():
     return choice
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AIPathFinder")
+    parser.add_argument("--serve", action="store_true", help="answer JSON-line path queries on stdin")
+    parser.add_argument("--map", help="grid file (.grid from grid_io, or a MovingAI .map) to serve")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--queue", type=int, default=64, help="searches waiting for a worker")
+    parser.add_argument("--timeout", type=float, help="default per-request timeout in seconds")
+    return parser.parse_args(argv)
+
+
+def serve(args):
+    if args.map is None:
+        grid = Grid(rows=8, cols=8)
+    elif args.map.endswith(".map"):
+        grid = load_movingai(args.map)
+    else:
+        grid = load_grid(args.map)
+    serve_stdin(grid, workers=args.workers, max_queue=args.queue, timeout=args.timeout)
+
+
 def main():
+    args = parse_args()
+    if args.serve:
+        serve(args)
+        return
+
     choice = choose_algorithm()
 
     # validate menu choice early; do not open any window if invalid
@@ -60,13 +93,10 @@ def main():
         "6": "Bidirectional",
     }.get(choice, "BFS")
 
-    gui = GridGUI(grid, title=f"AIPathFinder - {algo_name}")
-    gui.show_initial()
-
     # Dynamic obstacles feature removed; set probability to 0 so
     # algorithms run on a purely static grid.
     dynamic_prob = 0.0
-    pause = 0.15         # seconds between frames
+    pause = 0.15         # seconds between frames of the replay
 
     # Map the menu choice to the proper search function.
     # For DLS / IDDFS we wrap the function to provide the depth parameters.
@@ -101,8 +131,10 @@ def main():
     elif choice == "6":
         search_fn = bidirectional_search
 
-    # First: run the chosen search algorithm to compute a path and draw the final path.
-    path = search_fn(grid, gui, pause=pause)
+    # Record the search (no drawing, no pauses), then replay it.
+    recorder = SearchRecorder()
+    path = search_fn(grid, recorder, pause=pause)
+    gui = recorder.play(fps=1 / pause, title=f"AIPathFinder - {algo_name}")
 
     if not path:
         print("No path found - maybe walls completely block the target.")
@@ -0,0 +1,109 @@
+"""
+LRU cache in front of the search entry points.
+
+Results are keyed on (algorithm, params, start, goal, grid.version), so a
+wall or cost change (which bumps Grid.version) invalidates everything
+cached for the old layout.
+
+    cache = PathCache(grid, maxsize=1024)
+    path = cache.find_path("bfs", start, goal)
+
+With ``reuse_trees=True`` BFS / UCS queries sweep the whole region from
+the start once and answer every later goal for that start from the
+stored tree.  Those paths are just as short, but ties between
+equal-length paths may be broken differently than by a targeted search.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from grid_env import Grid
+from pathfinder import find_path
+from search_batch import TREE_SEARCHES, SourceTree, source_tree
+
+Node = Tuple[int, int]
+
+
+class PathCache:
+    """
+    Bounded LRU cache of search results for one grid.
+
+    ``maxsize`` bounds the number of cached paths and ``max_trees`` the
+    number of stored source trees (each holds one int32 per grid cell).
+    """
+
+    def __init__(
+        self,
+        grid: Grid,
+        maxsize: int = 1024,
+        reuse_trees: bool = False,
+        max_trees: int = 8,
+    ):
+        self.grid = grid
+        self.maxsize = maxsize
+        self.reuse_trees = reuse_trees
+        self.max_trees = max_trees
+
+        self.hits = 0
+        self.misses = 0
+        self.tree_hits = 0
+
+        self._version = grid.version
+        self._paths: "OrderedDict[tuple, List[Node]]" = OrderedDict()
+        self._trees: "OrderedDict[Tuple[str, Node], SourceTree]" = OrderedDict()
+
+    def find_path(self, algorithm: str, start: Node, goal: Node, **params) -> List[Node]:
+        """Cached equivalent of ``pathfinder.find_path`` for start -> goal."""
+        if self.grid.version != self._version:
+            self.clear()
+            self._version = self.grid.version
+
+        start, goal = tuple(start), tuple(goal)
+        key = (algorithm, tuple(sorted(params.items())), start, goal, self._version)
+        path = self._paths.get(key)
+        if path is not None:
+            self._paths.move_to_end(key)
+            self.hits += 1
+            return list(path)
+
+        self.misses += 1
+        if self.reuse_trees and algorithm in TREE_SEARCHES and not params:
+            path = self._tree(algorithm, start).path(goal)
+        else:
+            path = self._search(algorithm, start, goal, params)
+
+        self._paths[key] = path
+        if len(self._paths) > self.maxsize:
+            self._paths.popitem(last=False)
+        return list(path)
+
+    def _tree(self, algorithm: str, start: Node) -> SourceTree:
+        key = (algorithm, start)
+        tree = self._trees.get(key)
+        if tree is not None:
+            self._trees.move_to_end(key)
+            self.tree_hits += 1
+            return tree
+
+        tree = self._trees[key] = source_tree(self.grid, start, algorithm)
+        if len(self._trees) > self.max_trees:
+            self._trees.popitem(last=False)
+        return tree
+
+    def _search(self, algorithm: str, start: Node, goal: Node, params) -> List[Node]:
+        return find_path(self.grid, algorithm, start=start, goal=goal, **params)
+
+    def clear(self) -> None:
+        """Drop every cached path and tree (the counters are kept)."""
+        self._paths.clear()
+        self._trees.clear()
+
+    def info(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "tree_hits": self.tree_hits,
+            "paths": len(self._paths),
+            "trees": len(self._trees),
+            "maxsize": self.maxsize,
+        }
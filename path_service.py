@@ -0,0 +1,377 @@
+"""
+asyncio front of the search engines for one grid.
+
+    service = PathService(grid, workers=2, max_queue=64, timeout=0.5)
+    path = await service.find_path((0, 0), (7, 7), "bfs")
+    ...
+    await service.close()
+
+Searches run in a bounded thread pool, so the event loop stays free while
+they run.  Each worker thread searches its own Grid.view of the grid, so
+concurrent queries share the walls and neighbour tables but not their
+search state; start and goal are passed to each search, not set on a grid.
+
+- Backpressure: at most ``workers + max_queue`` searches are admitted at a
+  time; further callers wait for a slot instead of piling up work.
+- Coalescing: identical concurrent queries (algorithm, params, start,
+  goal and grid version) share one search and all get its path.
+- Timeouts: ``timeout`` (per request, or the service default) raises
+  asyncio.TimeoutError.  Every search runs headless, on the same fast
+  paths as a plain find_path call; once every caller waiting for a search
+  has given up, a search still waiting for a slot is dropped, and one
+  already running is cancelled (see search_utils.CancelToken) and stops
+  at its next expansion, freeing its worker and its slot.
+- Metrics: ``metrics()`` returns the counters and the latency and queue
+  depth histograms.
+
+Edit the grid between queries, not while they run: a wall or cost change
+bumps Grid.version, and later queries search fresh views.
+
+``serve_jsonl`` answers JSON lines such as
+
+    {"id": 1, "start": [0, 0], "goal": [7, 7], "algorithm": "ucs", "timeout": 0.2}
+    {"id": 2, "op": "metrics"}
+
+with one JSON line each, in completion order; ``python main.py --serve``
+runs it on stdin / stdout.  ``params`` may only hold the search options
+of CLIENT_PARAMS that the algorithm takes; anything else (``stats``,
+``gui``, ``pause``, ...) is answered with an error, as is a request whose
+search fails.
+"""
+
+import asyncio
+import bisect
+import inspect
+import json
+import numbers
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Dict, List, Optional, Sequence, Tuple
+
+from grid_env import Grid
+from pathfinder import ALGORITHMS, find_path
+from search_utils import CancelToken, SearchCancelled
+
+Node = Tuple[int, int]
+
+# histogram bucket upper bounds; a last bucket counts everything above
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# search options a serve_jsonl client may set in "params"
+CLIENT_PARAMS = frozenset({"vectorize", "prune", "frontier", "depth_limit", "max_depth", "complete"})
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: ``counts[i]`` observations were at most
+    ``bounds[i]`` (and above ``bounds[i - 1]``), ``counts[-1]`` above the
+    last bound.
+    """
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (inf if above all)."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return float("inf") if self.counts[-1] else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"bounds": list(self.bounds), "counts": list(self.counts), "count": self.count, "sum": self.sum}
+
+
+class _Job:
+    """One search shared by every caller waiting for the same query."""
+
+    def __init__(self, key: tuple):
+        self.key = key
+        self.waiters = 0
+        self.started = False  # handed to a worker thread
+        self.cancel = CancelToken()
+        self.task: Optional["asyncio.Future[Optional[List[Node]]]"] = None
+
+
+class PathService:
+    """Bounded async path queries on one grid, see the module docstring."""
+
+    def __init__(
+        self,
+        grid: Grid,
+        workers: int = 1,
+        max_queue: int = 64,
+        timeout: Optional[float] = None,
+    ):
+        if workers < 1 or max_queue < 0:
+            raise ValueError("workers must be at least 1 and max_queue not negative")
+        self.grid = grid
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self.requests = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queue_depth = Histogram(QUEUE_DEPTH_BUCKETS)
+
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="path-service")
+        self._slots = asyncio.Semaphore(workers + max_queue)
+        self._jobs: Dict[tuple, _Job] = {}
+        self._queued = 0  # handed to the pool, not yet picked up by a thread
+        self._lock = threading.Lock()
+        self._view_lock = threading.Lock()
+        self._local = threading.local()
+
+    async def __aenter__(self) -> "PathService":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def find_path(
+        self,
+        start: Node,
+        goal: Node,
+        algorithm: str = "bfs",
+        timeout: Optional[float] = None,
+        **params: Any,
+    ) -> List[Node]:
+        """
+        Path from ``start`` to ``goal`` (``[]`` if there is none).
+        ``timeout`` defaults to the service's; extra keyword arguments go
+        to the search function as with ``pathfinder.find_path``.
+        """
+        self.requests += 1
+        try:
+            if algorithm not in ALGORITHMS:
+                raise ValueError(f"unknown algorithm: {algorithm!r}")
+            if "cancel" in params:
+                raise ValueError("the service cancels its own searches, see the timeout")
+            start, goal = self._cell(start), self._cell(goal)
+        except ValueError:
+            self.errors += 1
+            raise
+        if timeout is None:
+            timeout = self.timeout
+
+        began = time.perf_counter()
+        key = (algorithm, tuple(sorted(params.items())), start, goal, self.grid.version)
+        job = self._jobs.get(key)
+        if job is None:
+            job = self._jobs[key] = _Job(key)
+            job.task = asyncio.ensure_future(self._compute(job, algorithm, start, goal, params))
+        else:
+            self.coalesced += 1
+
+        job.waiters += 1
+        try:
+            return list(await asyncio.wait_for(asyncio.shield(job.task), timeout))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            job.waiters -= 1
+            if not job.waiters and not job.task.done():
+                self._abandon(job)
+            self.latency.observe(time.perf_counter() - began)
+
+    def _cell(self, node: Any) -> Node:
+        """``node`` as a (row, col) tuple; ValueError unless it is a cell of the grid."""
+        try:
+            row, col = node
+        except (TypeError, ValueError):
+            raise ValueError(f"{node!r} is not a (row, col) pair") from None
+        for v in (row, col):
+            if not isinstance(v, numbers.Integral) or isinstance(v, bool):
+                raise ValueError(f"{node!r} is not a (row, col) pair of integers")
+        cell = (int(row), int(col))
+        if not self.grid.in_bounds(cell):
+            raise ValueError(f"{cell} is outside the {self.grid.rows} x {self.grid.cols} grid")
+        return cell
+
+    def _abandon(self, job: _Job) -> None:
+        """Nobody waits for ``job`` any more: drop it, or stop it if it is running."""
+        job.cancel.cancel()
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+        if not job.started:
+            job.task.cancel()
+
+    async def _compute(
+        self, job: _Job, algorithm: str, start: Node, goal: Node, params: Dict[str, Any]
+    ) -> Optional[List[Node]]:
+        try:
+            async with self._slots:
+                job.started = True
+                with self._lock:
+                    self.queue_depth.observe(self._queued)
+                    self._queued += 1
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor, self._run, job, algorithm, start, goal, params
+                )
+        finally:
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+
+    # ------------------------------------------------------------------
+    # worker threads
+    # ------------------------------------------------------------------
+    def _run(
+        self, job: _Job, algorithm: str, start: Node, goal: Node, params: Dict[str, Any]
+    ) -> Optional[List[Node]]:
+        with self._lock:
+            self._queued -= 1
+        if job.cancel.cancelled:  # abandoned while queued in the pool
+            return None
+        try:
+            return find_path(
+                self._view(), algorithm, cancel=job.cancel, start=start, goal=goal, **params
+            )
+        except SearchCancelled:
+            return None
+
+    def _view(self) -> Grid:
+        """This thread's Grid.view of the service grid, renewed when its version changes."""
+        grid = self.grid
+        local = self._local
+        if getattr(local, "version", None) != grid.version:
+            # one thread builds the shared tables, the others wait for them
+            with self._view_lock:
+                local.grid, local.version = grid.view(), grid.version
+        return local.grid
+
+    # ------------------------------------------------------------------
+    # reporting
+    # ------------------------------------------------------------------
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "in_flight": len(self._jobs),
+            "queued": self._queued,
+            "latency": self.latency.as_dict(),
+            "queue_depth": self.queue_depth.as_dict(),
+        }
+
+    async def close(self) -> None:
+        """Cancel the searches still waiting for a slot and stop the pool."""
+        for job in list(self._jobs.values()):
+            if not job.started:
+                self._abandon(job)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+
+
+async def serve_jsonl(
+    service: PathService, reader: Optional[IO[str]] = None, writer: Optional[IO[str]] = None
+) -> None:
+    """
+    Answer JSON-line requests from ``reader`` (stdin) on ``writer``
+    (stdout) until the input ends; see the module docstring.  Reading
+    stops while ``workers + max_queue`` requests are being answered,
+    which passes the backpressure on to the sender.
+    """
+    reader = reader or sys.stdin
+    writer = writer or sys.stdout
+    limit = asyncio.Semaphore(service.workers + service.max_queue)
+    pending = set()
+    while True:
+        await limit.acquire()
+        line = await asyncio.to_thread(reader.readline)
+        if not line.strip():
+            limit.release()
+            if not line:
+                break
+            continue
+        task = asyncio.ensure_future(_answer(service, line, writer))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        task.add_done_callback(lambda _: limit.release())
+    if pending:
+        await asyncio.gather(*pending)
+
+
+async def _answer(service: PathService, line: str, writer: IO[str]) -> None:
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("a request must be a JSON object")
+    except ValueError as exc:
+        reply: Dict[str, Any] = {"id": None, "error": str(exc)}
+    else:
+        reply = {"id": request.get("id")}
+        began = time.perf_counter()
+        try:
+            if request.get("op", "path") == "metrics":
+                reply["metrics"] = service.metrics()
+            else:
+                algorithm = request.get("algorithm", "bfs")
+                try:
+                    start, goal = request["start"], request["goal"]
+                    params = _client_params(algorithm, request.get("params", {}))
+                except (KeyError, ValueError):
+                    # rejected before reaching find_path, which counts its own
+                    service.requests += 1
+                    service.errors += 1
+                    raise
+                reply["path"] = await service.find_path(
+                    start, goal, algorithm, timeout=request.get("timeout"), **params
+                )
+                reply["ms"] = round((time.perf_counter() - began) * 1000, 3)
+        except asyncio.TimeoutError:
+            reply["error"] = "timeout"
+        except KeyError as exc:
+            reply["error"] = f"missing field {exc}"
+        except (TypeError, ValueError) as exc:
+            reply["error"] = str(exc)
+        except Exception as exc:
+            # a failed search must not take the server down with it
+            reply["error"] = f"{type(exc).__name__}: {exc}"
+    writer.write(json.dumps(reply) + "\n")
+    writer.flush()
+
+
+def _client_params(algorithm: str, params: Any) -> Dict[str, Any]:
+    """``params`` of a request, checked against CLIENT_PARAMS and the algorithm."""
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"unknown algorithm: {algorithm!r}")
+    if not isinstance(params, dict):
+        raise ValueError("params must be a JSON object")
+    accepted = CLIENT_PARAMS.intersection(inspect.signature(ALGORITHMS[algorithm]).parameters)
+    for name in params:
+        if name not in accepted:
+            raise ValueError(f"{algorithm} does not take parameter {name!r}")
+    return params
+
+
+def serve_stdin(grid: Grid, workers: int = 1, max_queue: int = 64, timeout: Optional[float] = None) -> None:
+    """Run ``serve_jsonl`` on stdin / stdout until stdin is closed."""
+
+    async def serve() -> None:
+        async with PathService(grid, workers, max_queue, timeout) as service:
+            await serve_jsonl(service)
+
+    asyncio.run(serve())
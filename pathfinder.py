@@ -0,0 +1,62 @@
+"""
+AIPathFinder – headless entry point.
+
+Runs any of the uninformed searches by name without importing matplotlib,
+so it can be used from services and scripts that have no display:
+
+    from grid_env import Grid
+    from pathfinder import find_path
+
+    path = find_path(Grid(), "bfs")
+
+Pass an observer (for example a GridGUI) to watch the search.
+"""
+
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from grid_env import Grid
+from search_bfs import bfs
+from search_dfs import dfs
+from search_ucs import ucs
+from search_dls import dls
+from search_iddfs import iddfs
+from search_bidirectional import bidirectional_search, bidirectional_ucs
+
+if TYPE_CHECKING:
+    from search_observer import SearchObserver
+
+Node = Tuple[int, int]
+
+# algorithm name -> search function, in the same order as the main.py menu
+# (plus the cost-aware bidirectional search, which has no menu entry)
+ALGORITHMS: Dict[str, Callable[..., List[Node]]] = {
+    "bfs": bfs,
+    "dfs": dfs,
+    "ucs": ucs,
+    "dls": dls,
+    "iddfs": iddfs,
+    "bidirectional": bidirectional_search,
+    "bidirectional-ucs": bidirectional_ucs,
+}
+
+
+def find_path(
+    grid: Grid,
+    algorithm: str = "bfs",
+    observer: Optional["SearchObserver"] = None,
+    **params,
+) -> List[Node]:
+    """
+    Run the named search from grid.start to grid.end and return the path.
+
+    Extra keyword arguments are passed to the search function
+    (for example ``depth_limit`` for DLS or ``max_depth`` for IDDFS, or
+    ``stats=SearchStats()`` for counters and timings, see search_stats).
+    ``start=`` / ``goal=`` search between other cells without touching
+    grid.start / grid.end, so threads can share a grid's endpoints.
+    """
+    try:
+        search_fn = ALGORITHMS[algorithm]
+    except KeyError:
+        raise ValueError(f"unknown algorithm: {algorithm!r}") from None
+    return search_fn(grid, observer, **params)
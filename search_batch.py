@@ -0,0 +1,162 @@
+"""
+Batch (many-to-many) path queries on a fixed Grid.
+
+Pairs are grouped by start cell and each start is answered by a single
+BFS / UCS sweep, so N starts x M goals cost N searches instead of N*M.
+Distances come back as a matrix; paths are rebuilt only when asked for.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np  # type: ignore
+
+from grid_env import Grid
+from search_bfs import bfs_tree
+from search_ucs import ucs_tree
+from search_utils import SearchState
+
+Node = Tuple[int, int]
+
+# sweep functions usable for batch queries (single-source trees)
+TREE_SEARCHES = {
+    "bfs": bfs_tree,
+    "ucs": ucs_tree,
+}
+
+
+class SourceTree:
+    """
+    Snapshot of one single-source sweep, enough to rebuild a path from
+    ``source``.  By default it keeps the parent of every cell reached (one
+    int32 per grid cell, -1 elsewhere), so it answers any goal; with
+    ``goals`` (cell ids) only the parent chains of those goals are kept.
+    """
+
+    def __init__(
+        self, grid: Grid, source: Node, state: SearchState, goals: Optional[Iterable[int]] = None
+    ):
+        self.grid = grid
+        self.source = source
+        self.parents: Union[np.ndarray, Dict[int, int]]
+        if goals is None:
+            # keep this source's tree; unreached cells point nowhere
+            self.parents = state.parent_array.copy()
+            self.parents[state.seen_array != state.epoch] = -1
+            return
+
+        s = grid.index(source)
+        seen, parent, epoch = state.seen, state.parent, state.epoch
+        chains: Dict[int, int] = {}
+        for v in goals:
+            # walk up until the chain joins one already kept
+            while v != s and v not in chains and seen[v] == epoch:
+                chains[v] = parent[v]
+                v = parent[v]
+        self.parents = chains
+
+    def path(self, goal: Node) -> List[Node]:
+        """Path from the source to ``goal`` ([] if unreachable or not kept)."""
+        if not self.grid.is_free(self.source):
+            return []  # a wall reaches nothing, as with find_path
+        s = self.grid.index(self.source)
+        cur = self.grid.index(goal)
+        if cur != s and self._parent(cur) < 0:
+            return []
+
+        path: List[Node] = []
+        while cur >= 0:
+            path.append(self.grid.node(cur))
+            if cur == s:
+                break
+            cur = self._parent(cur)
+
+        path.reverse()
+        return path
+
+    def _parent(self, v: int) -> int:
+        if isinstance(self.parents, dict):
+            return self.parents.get(v, -1)
+        return int(self.parents[v])
+
+
+def source_tree(grid: Grid, source: Node, algorithm: str = "bfs") -> SourceTree:
+    """Sweep the whole region reachable from ``source`` and keep the tree."""
+    try:
+        tree_search = TREE_SEARCHES[algorithm]
+    except KeyError:
+        raise ValueError(f"source trees support bfs/ucs, not {algorithm!r}") from None
+    return SourceTree(grid, source, tree_search(grid, grid.index(source)))
+
+
+class BatchResult:
+    """
+    Distances for every (source, goal) combination of a batch, plus the
+    search trees needed to rebuild any of those paths on demand.
+
+    ``distances[i, j]`` is the cost from ``sources[i]`` to ``goals[j]``,
+    or -1 when the goal is unreachable.  Costs are step counts (int32),
+    or float64 path costs for UCS on a grid with a cost layer.
+    """
+
+    def __init__(
+        self,
+        grid: Grid,
+        sources: List[Node],
+        goals: List[Node],
+        weighted: bool = False,
+    ):
+        self.grid = grid
+        self.sources = sources
+        self.goals = goals
+        dtype = np.float64 if weighted else np.int32
+        self.distances = np.full((len(sources), len(goals)), -1, dtype=dtype)
+        self._source_row = {node: i for i, node in enumerate(sources)}
+        self._goal_col = {node: j for j, node in enumerate(goals)}
+        self.trees: Dict[Node, SourceTree] = {}
+
+    def distance(self, start: Node, goal: Node):
+        return self.distances[self._source_row[start], self._goal_col[goal]].item()
+
+    def path(self, start: Node, goal: Node) -> List[Node]:
+        """Rebuild the path for one pair of the batch ([] if unreachable)."""
+        if self.distance(start, goal) < 0:
+            return []
+        return self.trees[start].path(goal)
+
+
+def batch_search(
+    grid: Grid,
+    pairs: Iterable[Tuple[Node, Node]],
+    algorithm: str = "bfs",
+) -> BatchResult:
+    """
+    Answer many (start, goal) queries with one sweep per distinct start.
+    ``algorithm`` is "bfs" or "ucs".  Each sweep stops once every goal of
+    the batch is settled, and only the goals' parent chains are kept.
+    """
+    if algorithm not in TREE_SEARCHES:
+        raise ValueError(f"batch queries support bfs/ucs, not {algorithm!r}")
+
+    pairs = list(pairs)
+    sources = list(dict.fromkeys(start for start, _ in pairs))
+    goals = list(dict.fromkeys(goal for _, goal in pairs))
+    weighted = algorithm == "ucs" and grid.step_costs() is not None
+    result = BatchResult(grid, sources, goals, weighted)
+    goal_ids = np.array([grid.index(goal) for goal in goals], dtype=np.int64)
+    labels = grid.components().labels
+    goal_labels = labels[goal_ids]
+
+    tree_search = TREE_SEARCHES[algorithm]
+    for i, source in enumerate(sources):
+        s = grid.index(source)
+        if labels[s] < 0:
+            continue  # a wall reaches nothing, as with find_path
+        # goals in other components would only make the sweep exhaust its own
+        targets = goal_ids[goal_labels == labels[s]].tolist()
+        state = tree_search(grid, s, goals=targets)
+        reached = state.seen_array[goal_ids] == state.epoch
+        costs = state.cost_array if weighted else state.dist_array
+        result.distances[i, reached] = costs[goal_ids[reached]]
+        result.trees[source] = SourceTree(grid, source, state, targets)
+
+    return result
@@ -1,58 +1,279 @@
 from collections import deque
-from typing import Dict, Optional, Tuple, List
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple, List
+
+import numpy as np  # type: ignore
 
 from grid_env import Grid
-from view_gui import GridGUI
-from search_utils import reconstruct_path
+from search_jps import jump_point_search
+from search_stats import SearchStats, instrumented, phase
+from search_utils import CancelToken, SearchState, next_goal, reconstruct_path
+
+if TYPE_CHECKING:
+    from search_observer import SearchObserver
 
 Node = Tuple[int, int]
 
+# Below this many cells the per-level NumPy overhead of the vectorised
+# BFS outweighs its gain, so the scalar queue is used instead.
+VECTORIZE_MIN_CELLS = 64 * 64
+# Levels narrower than this are expanded in plain Python even by the
+# vectorised BFS, by the scalar queue, so long thin searches (corridors,
+# mazes) do not pay the NumPy overhead once per one-cell level.
+VECTORIZE_MIN_FRONTIER = 256
+
 
+@instrumented("bfs")
 def bfs(
     grid: Grid,
-    gui: GridGUI,
+    gui: Optional["SearchObserver"] = None,
     pause: float = 0.1,
+    vectorize: Optional[bool] = None,
+    prune: bool = False,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    start: Optional[Node] = None,
+    goal: Optional[Node] = None,
 ) -> List[Node]:
     """
     Breadth-First Search (unit cost, shortest number of steps).
     Returns the discovered path from start to end (including both).
+    Pass ``gui=None`` to run headless.
+
+    Headless searches on large grids expand a whole level at a time with
+    NumPy (``vectorize=None`` picks automatically, True/False forces it).
+    Both modes return the same path.
+
+    ``prune=True`` expands jump points only (see search_jps), which skips
+    most symmetric paths through open space.  The path is still a
+    shortest one, though not always the same one.
+
+    ``stats`` (a SearchStats) collects counters and phase timings.
+    ``cancel`` (a CancelToken) stops the search from another thread.
+    ``start`` / ``goal`` default to grid.start / grid.end.
+    """
+    start = grid.start if start is None else start
+    goal = grid.end if goal is None else goal
+    s, t = grid.index(start), grid.index(goal)
+    if gui is not None:
+        with phase(stats, "reset"):
+            gui.on_clear(grid)
+    if not grid.components().connected(start, goal):
+        return []
+
+    with phase(stats, "search"):
+        if prune:
+            state = jump_point_search(grid, s, t, gui, pause, stats, cancel)
+        elif gui is None:
+            state = bfs_tree(grid, s, t, vectorize=vectorize, stats=stats, cancel=cancel)
+        else:
+            state = _bfs_scalar(grid, s, t, gui, pause, stats, cancel)
+    with phase(stats, "reconstruct"):
+        cols = grid.cols if prune else None
+        path = [grid.node(v) for v in reconstruct_path(state, s, t, cols=cols)]
+    if not path:
+        return []
+
+    # mark final path
+    if gui is not None:
+        for node in path:
+            gui.on_path(grid, node)
+            gui.update(pause=pause)
+
+    return path
+
+
+def bfs_tree(
+    grid: Grid,
+    source: int,
+    goal: int = -1,
+    vectorize: Optional[bool] = None,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    goals: Optional[Sequence[int]] = None,
+) -> SearchState:
+    """
+    Headless BFS from cell id ``source``.  Stops once ``goal`` is reached,
+    or sweeps the whole reachable region when ``goal`` is -1.  ``goals``
+    (cell ids) replaces ``goal``: the sweep stops once every one of them
+    is reached or the region is exhausted.
+
+    Returns the grid's shared SearchState (valid until the next search),
+    holding BFS distances and parents for every reached cell.
     """
-    grid.clear_search_marks()
-    start, goal = grid.start, grid.end
+    if vectorize is None:
+        vectorize = grid.rows * grid.cols >= VECTORIZE_MIN_CELLS
+    if goals is not None:
+        goals = list(goals)
+        goal = goals[-1] if goals else source
+    if vectorize:
+        return _bfs_vectorized(grid, source, goal, stats, cancel, goals)
+    return _bfs_scalar(grid, source, goal, None, 0.0, stats, cancel, goals)
 
-    q: deque[Node] = deque()
-    q.append(start)
-    parent: Dict[Node, Optional[Node]] = {start: None}
-    grid.mark_visit(start)
+
+def _bfs_scalar(
+    grid: Grid,
+    s: int,
+    t: int,
+    gui: Optional["SearchObserver"],
+    pause: float,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    goals: Optional[List[int]] = None,
+) -> SearchState:
+    # expand over integer cell ids and the precomputed neighbour table
+    offsets, targets = grid.adjacency()
+
+    state = grid.search_state()
+    epoch = state.begin()
+    seen, parent, dist = state.seen, state.parent, state.dist
+    state.visit(s, -1, 0)
+
+    q: deque[int] = deque()
+    q.append(s)
+    track = stats is not None
+    expanded = max_frontier = 0
 
     while q:
+        if cancel is not None:
+            cancel.check()
+        if track:
+            expanded += 1
+            max_frontier = max(max_frontier, len(q))
         current = q.popleft()
-        if current not in (start, goal):
-            grid.grid[current] = Grid.EXPLORED
+        if gui is not None:
+            gui.on_expand(grid, grid.node(current))
 
-        if current == goal:
-            break
+        if current == t:
+            t = next_goal(goals, seen, epoch, dist, dist[current] + 1) if goals else -1
+            if t < 0:
+                break
 
-        for nbr in grid.neighbors(current):
-            if nbr not in parent:
+        d = dist[current] + 1
+        for i in range(offsets[current], offsets[current + 1]):
+            nbr = targets[i]
+            if seen[nbr] != epoch:
+                seen[nbr] = epoch
                 parent[nbr] = current
-                grid.mark_visit(nbr)
-                if nbr not in (start, goal):
-                    grid.grid[nbr] = Grid.FRONTIER
+                dist[nbr] = d
+                if gui is not None:
+                    gui.on_discover(grid, grid.node(nbr))
                 q.append(nbr)
 
-        gui.update(pause=pause)
+        if gui is not None:
+            gui.update(pause=pause)
 
-    path = reconstruct_path(parent, start, goal)
-    if not path:
-        return []
+    if track:
+        stats.add(expanded, expanded + len(q), max_frontier=max_frontier)
+    return state
 
-    # mark final path
-    for node in path:
-        if node not in (start, goal):
-            grid.grid[node] = Grid.PATH
-        gui.update(pause=pause)
 
-    return path
+def _bfs_vectorized(
+    grid: Grid,
+    s: int,
+    t: int,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    goals: Optional[List[int]] = None,
+) -> SearchState:
+    """
+    Level-synchronous BFS: the whole frontier is expanded per step by
+    shifting cell ids with each of Grid.MOVES.  Levels narrower than
+    VECTORIZE_MIN_FRONTIER are drained through a scalar queue instead, in
+    the same order, until a level is wide again.
+
+    The scalar queue hands a cell to the first frontier cell (in queue
+    order) that reaches it, trying moves in Grid.MOVES order, and queues
+    new cells in that same order.  Ranking every candidate by
+    ``frontier position * len(MOVES) + move`` and keeping the smallest
+    rank per cell reproduces exactly that, so distances and parents match.
+    """
+    rows, cols = grid.rows, grid.cols
+    free = None  # built on the first wide level
+    offsets, targets = grid.adjacency()
+    n_moves = len(Grid.MOVES)
+
+    state = grid.search_state()
+    epoch = state.begin()
+    seen, parent, dist = state.seen_array, state.parent_array, state.dist_array
+    seen_v, parent_v, dist_v = state.seen, state.parent, state.dist
+    state.visit(s, -1, 0)
+
+    frontier = [s]
+    level = 0
+    track = stats is not None
+    expanded, generated, max_frontier = 0, 1, 1
+    while len(frontier):
+        if t >= 0 and seen_v[t] == epoch:
+            # a reached cell already has its final distance and parent
+            t = next_goal(goals, seen_v, epoch, dist_v, level + 1) if goals else -1
+            if t < 0:
+                break
+        if cancel is not None:
+            cancel.check()
+        if len(frontier) < VECTORIZE_MIN_FRONTIER:
+            # drain with the scalar queue; whenever a level is complete the
+            # queue holds exactly the next one, so hand that back once it is wide
+            q = deque(frontier.tolist() if isinstance(frontier, np.ndarray) else frontier)
+            while q:
+                if cancel is not None:
+                    cancel.check()
+                v = q.popleft()
+                if dist_v[v] != level:
+                    level += 1
+                    if len(q) + 1 >= VECTORIZE_MIN_FRONTIER or (t >= 0 and seen_v[t] == epoch):
+                        q.appendleft(v)
+                        break
+                if track:
+                    expanded += 1
+                    max_frontier = max(max_frontier, len(q) + 1)
+                for i in range(offsets[v], offsets[v + 1]):
+                    nbr = targets[i]
+                    if seen_v[nbr] != epoch:
+                        seen_v[nbr] = epoch
+                        parent_v[nbr] = v
+                        dist_v[nbr] = level + 1
+                        q.append(nbr)
+                        if track:
+                            generated += 1
+            frontier = list(q)
+            continue
+
+        level += 1
+        if track:
+            expanded += len(frontier)
+        if free is None:
+            free = grid.free_mask().ravel()
+        frontier = np.asarray(frontier, dtype=np.int64)
+        r, c = np.divmod(frontier, cols)
+
+        # candidates[i, k]: cell reached from frontier[i] by move k, or -1
+        candidates = np.full((frontier.size, n_moves), -1, dtype=np.int64)
+        for k, (dr, dc) in enumerate(Grid.MOVES):
+            ok = (r + dr >= 0) & (r + dr < rows) & (c + dc >= 0) & (c + dc < cols)
+            candidates[ok, k] = frontier[ok] + (dr * cols + dc)
+
+        # row-major flattening is already sorted by rank
+        candidates = candidates.ravel()
+        keep = np.flatnonzero(candidates >= 0)
+        keep = keep[free[candidates[keep]]]
+        keep = keep[seen[candidates[keep]] != epoch]
+        if not keep.size:
+            break
+
+        # first occurrence of each cell = its smallest rank
+        _, first = np.unique(candidates[keep], return_index=True)
+        first.sort()
+        ranks = keep[first]
+        parents = frontier[ranks // n_moves]
+        frontier = candidates[ranks]
 
+        seen[frontier] = epoch
+        parent[frontier] = parents
+        dist[frontier] = level
+        if track:
+            generated += frontier.size
+            max_frontier = max(max_frontier, frontier.size)
 
+    if track:
+        stats.add(expanded, generated, max_frontier=max_frontier)
+    return state
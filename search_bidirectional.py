@@ -1,115 +1,284 @@
-from collections import deque
-from typing import Dict, Optional, Tuple, List
+import heapq
+from typing import TYPE_CHECKING, Optional, Tuple, List
 
 from grid_env import Grid
-from view_gui import GridGUI
+from search_stats import SearchStats, instrumented, phase
+from search_utils import CancelToken, SearchState, reconstruct_path
+
+if TYPE_CHECKING:
+    from search_observer import SearchObserver
 
 Node = Tuple[int, int]
 
 
-def _reconstruct_meeting_path(
-    parent_start: Dict[Node, Optional[Node]],
-    parent_goal: Dict[Node, Optional[Node]],
-    meet: Node,
-    start: Node,
-    goal: Node,
-) -> List[Node]:
-    # path from start -> meet
-    path_start: List[Node] = []
-    cur: Optional[Node] = meet
-    while cur is not None:
-        path_start.append(cur)
-        if cur == start:
-            break
-        cur = parent_start.get(cur)
-    path_start.reverse()
-
-    # path from meet -> goal
-    path_goal: List[Node] = []
-    cur = parent_goal.get(meet)
-    while cur is not None:
-        path_goal.append(cur)
+def _goal_chain(state_goal: SearchState, node: int, goal: int) -> List[int]:
+    # the goal-side tree points towards the goal: node -> ... -> goal
+    chain: List[int] = []
+    parents = state_goal.parent
+    cur = node
+    while cur >= 0:
+        chain.append(cur)
         if cur == goal:
             break
-        cur = parent_goal.get(cur)
-
-    return path_start + path_goal
+        cur = parents[cur]
+    return chain
 
 
+@instrumented("bidirectional")
 def bidirectional_search(
     grid: Grid,
-    gui: GridGUI,
+    gui: Optional["SearchObserver"] = None,
     pause: float = 0.1,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    start: Optional[Node] = None,
+    goal: Optional[Node] = None,
 ) -> List[Node]:
     """
-    Bidirectional BFS from start and goal simultaneously.
+    Bidirectional BFS from start and goal simultaneously; returns a
+    shortest path.  Pass ``gui=None`` to run headless.
+
+    Each round expands one full layer of whichever side has the smaller
+    frontier.  The goal side walks the reverse neighbour table, so it
+    follows moves backwards.  Meetings are detected when a node is
+    generated, and the search stops as soon as no unseen path can be
+    shorter than the best meeting.  With every node above the two frontier
+    depths expanded, any path of length <= ``depth_start + depth_goal``
+    has a node seen by both sides and was already met, so a meeting of
+    length ``depth_start + depth_goal + 1`` is optimal.
+
+    ``stats`` (a SearchStats) collects counters and phase timings, with
+    the nodes expanded on each side in ``stats.extra["expanded_start"]``
+    and ``stats.extra["expanded_goal"]``.
+    ``cancel`` (a CancelToken) stops the search from another thread.
+    ``start`` / ``goal`` default to grid.start / grid.end.
     """
-    grid.clear_search_marks()
-    start, goal = grid.start, grid.end
-
-    q_start: deque[Node] = deque([start])
-    q_goal: deque[Node] = deque([goal])
-
-    parent_start: Dict[Node, Optional[Node]] = {start: None}
-    parent_goal: Dict[Node, Optional[Node]] = {goal: None}
-    grid.mark_visit(start)
-    grid.mark_visit(goal)
-
-    visited_start = {start}
-    visited_goal = {goal}
-
-    meet: Optional[Node] = None
-
-    while q_start and q_goal and meet is None:
-        # expand from start side
-        for _ in range(len(q_start)):
-            current = q_start.popleft()
-            if current not in (start, goal):
-                grid.grid[current] = Grid.EXPLORED
-            if current in visited_goal:
-                meet = current
-                break
-            for nbr in grid.neighbors(current):
-                if nbr not in visited_start:
-                    visited_start.add(nbr)
-                    parent_start[nbr] = current
-                    grid.mark_visit(nbr)
-                    if nbr not in (start, goal):
-                        grid.grid[nbr] = Grid.FRONTIER
-                    q_start.append(nbr)
-
-        if meet is not None:
-            break
+    start = grid.start if start is None else start
+    goal = grid.end if goal is None else goal
+    if gui is not None:
+        with phase(stats, "reset"):
+            gui.on_clear(grid)
+        gui.on_discover(grid, goal)
+    if not grid.components().connected(start, goal):
+        return []
 
-        # expand from goal side
-        for _ in range(len(q_goal)):
-            current = q_goal.popleft()
-            if current not in (start, goal):
-                grid.grid[current] = Grid.EXPLORED
-            if current in visited_start:
-                meet = current
-                break
-            for nbr in grid.neighbors(current):
-                if nbr not in visited_goal:
-                    visited_goal.add(nbr)
-                    parent_goal[nbr] = current
-                    grid.mark_visit(nbr)
-                    if nbr not in (start, goal):
-                        grid.grid[nbr] = Grid.FRONTIER
-                    q_goal.append(nbr)
+    s, t = grid.index(start), grid.index(goal)
+
+    with phase(stats, "search"):
+        state_start = grid.search_state(0)
+        state_goal = grid.search_state(1)
+        epoch_start = state_start.begin()
+        epoch_goal = state_goal.begin()
+        state_start.visit(s, -1, 0)
+        state_goal.visit(t, -1, 0)
 
-        gui.update(pause=pause)
+        # per side: frontier, depth of that frontier, nodes expanded, plus
+        # (edge table, own state, own epoch, other state, other epoch, forward?)
+        frontiers = [[s], [t]]
+        depths = [0, 0]
+        expanded = [0, 0]
+        sides = (
+            (grid.adjacency(), state_start, epoch_start, state_goal, epoch_goal, True),
+            (grid.reverse_adjacency(), state_goal, epoch_goal, state_start, epoch_start, False),
+        )
+
+        best = 0 if s == t else grid.rows * grid.cols  # longer than any path
+        meet: Optional[Tuple[int, int]] = (s, s) if s == t else None  # joining edge (u, v)
+        generated, max_frontier = 2, 2
+
+        while frontiers[0] and frontiers[1] and best > depths[0] + depths[1] + 1:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            (offsets, targets), own, epoch, other, other_epoch, forward = sides[side]
+            seen, parent, dist = own.seen, own.parent, own.dist
+            other_seen, other_dist = other.seen, other.dist
+
+            next_frontier: List[int] = []
+            d = depths[side] + 1
+            for current in frontiers[side]:
+                if cancel is not None:
+                    cancel.check()
+                expanded[side] += 1
+                if gui is not None:
+                    gui.on_expand(grid, grid.node(current))
+                for i in range(offsets[current], offsets[current + 1]):
+                    nbr = targets[i]
+                    if seen[nbr] != epoch:
+                        seen[nbr] = epoch
+                        parent[nbr] = current
+                        dist[nbr] = d
+                        if gui is not None:
+                            gui.on_discover(grid, grid.node(nbr))
+                        next_frontier.append(nbr)
+                    if other_seen[nbr] == other_epoch and d + other_dist[nbr] < best:
+                        best = d + other_dist[nbr]
+                        meet = (current, nbr) if forward else (nbr, current)
+                # the current layer is only partly expanded, so its depth still
+                # counts as the frontier depth for the stopping rule
+                if best <= depths[0] + depths[1] + 1:
+                    break
+
+            frontiers[side] = next_frontier
+            depths[side] = d
+            generated += len(next_frontier)
+            max_frontier = max(max_frontier, len(frontiers[0]) + len(frontiers[1]))
+
+            if gui is not None:
+                gui.update(pause=pause)
+
+        if stats is not None:
+            stats.add(sum(expanded), generated, max_frontier=max_frontier)
+            stats.extra["expanded_start"], stats.extra["expanded_goal"] = expanded
 
     if meet is None:
         return []
 
-    path = _reconstruct_meeting_path(parent_start, parent_goal, meet, start, goal)
+    with phase(stats, "reconstruct"):
+        u, v = meet
+        ids = reconstruct_path(state_start, s, u)
+        if v != u:
+            ids += _goal_chain(state_goal, v, t)
+        path = [grid.node(i) for i in ids]
 
-    for node in path:
-        if node not in (start, goal):
-            grid.grid[node] = Grid.PATH
-        gui.update(pause=pause)
+    if gui is not None:
+        for node in path:
+            gui.on_path(grid, node)
+            gui.update(pause=pause)
 
     return path
 
 
+@instrumented("bidirectional-ucs")
+def bidirectional_ucs(
+    grid: Grid,
+    gui: Optional["SearchObserver"] = None,
+    pause: float = 0.1,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    start: Optional[Node] = None,
+    goal: Optional[Node] = None,
+) -> List[Node]:
+    """
+    Cost-aware bidirectional search: Dijkstra forward from the start and
+    backward from the goal over the reverse neighbour table, using the
+    grid's cost layer (unit cost when none is set).
+
+    Each round expands the side whose queue has the cheaper top entry.
+    Whenever an edge joins the two trees the best start->goal cost seen so
+    far is updated; the search stops once the two queue tops together can
+    no longer beat it, which proves the path optimal.  ``stats``,
+    ``cancel``, ``start`` and ``goal`` work as in ``bidirectional_search``,
+    plus ``duplicates`` for re-pushed nodes.
+    """
+    start = grid.start if start is None else start
+    goal = grid.end if goal is None else goal
+    if gui is not None:
+        with phase(stats, "reset"):
+            gui.on_clear(grid)
+        gui.on_discover(grid, goal)
+    if not grid.components().connected(start, goal):
+        return []
+
+    s, t = grid.index(start), grid.index(goal)
+    with phase(stats, "search"):
+        weights = grid.step_costs()
+        if weights is None:
+            cell_cost, diag_step, diag_cost = None, 0, 1
+        else:
+            cell_cost, diag_step, diag_cost = weights.cells, weights.diagonal_step, weights.diagonal_cost
+
+        state_start = grid.search_state(0)
+        state_goal = grid.search_state(1)
+        epoch_start = state_start.begin()
+        epoch_goal = state_goal.begin()
+        state_start.visit(s, -1)
+        state_goal.visit(t, -1)
+        cost_start = state_start.path_costs()
+        cost_goal = state_goal.path_costs()
+        cost_start[s] = 0.0
+        cost_goal[t] = 0.0
+
+        # (edge table, own state, own epoch, own costs, other state, other epoch,
+        #  other costs, forward?) for each direction
+        sides = (
+            (grid.adjacency(), state_start, epoch_start, cost_start,
+             state_goal, epoch_goal, cost_goal, True),
+            (grid.reverse_adjacency(), state_goal, epoch_goal, cost_goal,
+             state_start, epoch_start, cost_start, False),
+        )
+        queues: Tuple[List[Tuple[float, int]], ...] = ([(0.0, s)], [(0.0, t)])
+
+        expanded = [0, 0]
+        best = float("inf")
+        meet: Optional[Tuple[int, int]] = None  # edge (u, v) joining the trees
+        if s == t:
+            best, meet = 0.0, (s, s)
+        track = stats is not None
+        generated, duplicates, max_frontier = 2, 0, 2
+
+        while queues[0] and queues[1]:
+            if cancel is not None:
+                cancel.check()
+            if queues[0][0][0] + queues[1][0][0] >= best:
+                break
+            if track:
+                max_frontier = max(max_frontier, len(queues[0]) + len(queues[1]))
+            side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+            (offsets, targets), own, epoch, own_cost, other, other_epoch, other_cost, forward = sides[side]
+            pq = queues[side]
+            seen, parent, other_seen = own.seen, own.parent, other.seen
+
+            current_cost, current = heapq.heappop(pq)
+            if current_cost > own_cost[current]:
+                continue  # stale entry
+            expanded[side] += 1
+            if gui is not None:
+                gui.on_expand(grid, grid.node(current))
+
+            for i in range(offsets[current], offsets[current + 1]):
+                nbr = targets[i]
+                # the edge is current->nbr forward and nbr->current backward;
+                # either way the step costs the cell being entered
+                if cell_cost is None:
+                    step = 1
+                else:
+                    step = cell_cost[nbr] if forward else cell_cost[current]
+                    if nbr - current == diag_step or current - nbr == diag_step:
+                        step *= diag_cost
+                new_cost = current_cost + step
+                if seen[nbr] != epoch or new_cost < own_cost[nbr]:
+                    if track:
+                        generated += 1
+                        duplicates += seen[nbr] == epoch
+                    seen[nbr] = epoch
+                    own_cost[nbr] = new_cost
+                    parent[nbr] = current
+                    heapq.heappush(pq, (new_cost, nbr))
+                    if gui is not None:
+                        gui.on_discover(grid, grid.node(nbr))
+                if other_seen[nbr] == other_epoch and new_cost + other_cost[nbr] < best:
+                    best = new_cost + other_cost[nbr]
+                    meet = (current, nbr) if forward else (nbr, current)
+
+            if gui is not None:
+                gui.update(pause=pause)
+
+        if stats is not None:
+            stats.add(sum(expanded), generated, duplicates, max_frontier)
+            stats.extra["expanded_start"], stats.extra["expanded_goal"] = expanded
+
+    if meet is None:
+        return []
+
+    with phase(stats, "reconstruct"):
+        u, v = meet
+        ids = reconstruct_path(state_start, s, u)
+        if v != u:
+            ids += _goal_chain(state_goal, v, t)
+        path = [grid.node(i) for i in ids]
+
+    if gui is not None:
+        for node in path:
+            gui.on_path(grid, node)
+            gui.update(pause=pause)
+
+    return path
@@ -1,57 +1,103 @@
-from typing import Dict, Optional, Tuple, List
+from typing import TYPE_CHECKING, Optional, Tuple, List
 
 from grid_env import Grid
-from view_gui import GridGUI
-from search_utils import reconstruct_path
+from search_stats import SearchStats, instrumented, phase
+from search_utils import CancelToken, SearchState, reconstruct_path
+
+if TYPE_CHECKING:
+    from search_observer import SearchObserver
 
 Node = Tuple[int, int]
 
 
+@instrumented("dfs")
 def dfs(
     grid: Grid,
-    gui: GridGUI,
+    gui: Optional["SearchObserver"] = None,
     pause: float = 0.1,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    start: Optional[Node] = None,
+    goal: Optional[Node] = None,
 ) -> List[Node]:
     """
     Depth-First Search using an explicit stack.
+    Pass ``gui=None`` to run headless.
+    ``stats`` (a SearchStats) collects counters and phase timings.
+    ``cancel`` (a CancelToken) stops the search from another thread.
+    ``start`` / ``goal`` default to grid.start / grid.end.
     """
-    grid.clear_search_marks()
-    start, goal = grid.start, grid.end
+    start = grid.start if start is None else start
+    goal = grid.end if goal is None else goal
+    if gui is not None:
+        with phase(stats, "reset"):
+            gui.on_clear(grid)
+    if not grid.components().connected(start, goal):
+        return []
+
+    s, t = grid.index(start), grid.index(goal)
+    with phase(stats, "search"):
+        state = _dfs(grid, s, t, gui, pause, stats, cancel)
+    with phase(stats, "reconstruct"):
+        path = [grid.node(v) for v in reconstruct_path(state, s, t)]
+    if not path:
+        return []
 
-    stack: List[Node] = [start]
-    parent: Dict[Node, Optional[Node]] = {start: None}
-    grid.mark_visit(start)
+    if gui is not None:
+        for node in path:
+            gui.on_path(grid, node)
+            gui.update(pause=pause)
+
+    return path
+
+
+def _dfs(
+    grid: Grid,
+    s: int,
+    t: int,
+    gui: Optional["SearchObserver"],
+    pause: float,
+    stats: Optional[SearchStats],
+    cancel: Optional[CancelToken] = None,
+) -> SearchState:
+    offsets, targets = grid.adjacency()
+
+    state = grid.search_state()
+    epoch = state.begin()
+    seen, parent = state.seen, state.parent
+    state.visit(s, -1)
+
+    stack: List[int] = [s]
+    track = stats is not None
+    expanded = max_frontier = 0
 
     while stack:
+        if cancel is not None:
+            cancel.check()
+        if track:
+            expanded += 1
+            max_frontier = max(max_frontier, len(stack))
         current = stack.pop()
-        if current not in (start, goal):
-            grid.grid[current] = Grid.EXPLORED
+        if gui is not None:
+            gui.on_expand(grid, grid.node(current))
 
-        if current == goal:
+        if current == t:
             break
 
         # push neighbours in reverse order so the first in movement order is expanded first
-        neighbours = list(grid.neighbors(current))
-        neighbours.reverse()
-        for nbr in neighbours:
-            if nbr not in parent:
+        for i in range(offsets[current + 1] - 1, offsets[current] - 1, -1):
+            nbr = targets[i]
+            if seen[nbr] != epoch:
+                seen[nbr] = epoch
                 parent[nbr] = current
-                grid.mark_visit(nbr)
-                if nbr not in (start, goal):
-                    grid.grid[nbr] = Grid.FRONTIER
+                if gui is not None:
+                    gui.on_discover(grid, grid.node(nbr))
                 stack.append(nbr)
 
-        gui.update(pause=pause)
-
-    path = reconstruct_path(parent, start, goal)
-    if not path:
-        return []
-
-    for node in path:
-        if node not in (start, goal):
-            grid.grid[node] = Grid.PATH
-        gui.update(pause=pause)
-
-    return path
-
+        if gui is not None:
+            gui.update(pause=pause)
 
+    if track:
+        # every push is either expanded or still on the stack
+        stats.add(expanded, expanded + len(stack), max_frontier=max_frontier)
+    return state
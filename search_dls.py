@@ -1,73 +1,166 @@
-from typing import Dict, Optional, Tuple, List
+from typing import TYPE_CHECKING, Optional, Tuple, List
 
 from grid_env import Grid
-from view_gui import GridGUI
-from search_utils import reconstruct_path
+from search_stats import SearchStats, instrumented, phase
+from search_utils import CancelToken, SearchState, reconstruct_path
+
+if TYPE_CHECKING:
+    from search_observer import SearchObserver
 
 Node = Tuple[int, int]
 
 
-def _recursive_dls(
+def depth_limited_pass(
     grid: Grid,
-    current: Node,
-    goal: Node,
+    s: int,
+    goal: int,
     depth_limit: int,
-    parent: Dict[Node, Optional[Node]],
-    gui: GridGUI,
+    state: SearchState,
+    gui: Optional["SearchObserver"],
     pause: float,
-) -> bool:
-    if current not in (grid.start, grid.end):
-        grid.grid[current] = Grid.EXPLORED
-    gui.update(pause=pause)
-
-    if current == goal:
-        return True
-    if depth_limit == 0:
-        return False
-
-    for nbr in grid.neighbors(current):
-        if nbr not in parent:
-            parent[nbr] = current
-            grid.mark_visit(nbr)
-            if nbr not in (grid.start, grid.end):
-                grid.grid[nbr] = Grid.FRONTIER
+    complete: bool = False,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+) -> Tuple[bool, bool]:
+    """
+    One depth-limited DFS from cell id ``s`` (already visited in
+    ``state``), using an explicit stack instead of recursion.
+
+    Nodes are expanded in the same order as a recursive DFS.  By default a
+    node is never revisited, like the classic version; that can miss a
+    goal that is within the limit but was first reached by a longer
+    branch.  With ``complete=True`` ``state.dist`` acts as a best-depth
+    table and a node is expanded again whenever it is reached at a
+    shallower depth, which finds every goal within the limit.
+
+    Returns ``(found, cutoff)`` where ``cutoff`` tells whether the limit
+    stopped a node that still had unseen neighbours; without a cutoff a
+    deeper pass would repeat this one step for step.
+
+    ``stats`` receives the nodes expanded and the deepest stack reached.
+    """
+    if depth_limit < 0:
+        return False, False
+    offsets, targets = grid.adjacency()
+    seen, parent, dist, epoch = state.seen, state.parent, state.dist, state.epoch
+
+    if gui is not None:
+        gui.on_expand(grid, grid.node(s))
+        gui.update(pause=pause)
+    if s == goal:
+        if stats is not None:
+            stats.add(1, 1, max_frontier=1)
+        return True, False
+
+    # preallocated per-depth iterator state: node, next edge, end of edges.
+    # The stack is always a simple path (a node is only pushed again at a
+    # shallower depth), so it never holds more than every cell.
+    size = min(depth_limit, grid.rows * grid.cols) + 1
+    node_at = [0] * size
+    pos = [0] * size
+    end = [0] * size
+    node_at[0], pos[0], end[0] = s, offsets[s], offsets[s + 1]
+    depth = 0 if depth_limit > 0 else -1
+    cutoff = depth_limit == 0 and any(
+        seen[targets[i]] != epoch for i in range(offsets[s], offsets[s + 1])
+    )
+    found = False
+    track = stats is not None
+    visited = deepest = 1
+
+    while depth >= 0:
+        if cancel is not None:
+            cancel.check()
+        i = pos[depth]
+        if i == end[depth]:
+            depth -= 1
+            continue
+        pos[depth] = i + 1
+
+        nbr = targets[i]
+        if seen[nbr] == epoch and (not complete or dist[nbr] <= depth + 1):
+            continue
+        seen[nbr] = epoch
+        parent[nbr] = node_at[depth]
+        dist[nbr] = depth + 1
+        visited += 1
+        if track:
+            deepest = max(deepest, depth + 2)
+        if gui is not None:
+            gui.on_discover(grid, grid.node(nbr))
             gui.update(pause=pause)
-            if _recursive_dls(
-                grid, nbr, goal, depth_limit - 1, parent, gui, pause
-            ):
-                return True
-    return False
+            gui.on_expand(grid, grid.node(nbr))
+            gui.update(pause=pause)
+
+        if nbr == goal:
+            found = True
+            break
 
+        first, last = offsets[nbr], offsets[nbr + 1]
+        if depth + 1 == depth_limit:
+            if not cutoff:
+                cutoff = any(seen[targets[j]] != epoch for j in range(first, last))
+            continue
 
+        depth += 1
+        node_at[depth], pos[depth], end[depth] = nbr, first, last
+
+    if track:
+        # every visited node is expanded on the spot, as in recursive DFS
+        stats.add(visited, visited, max_frontier=deepest)
+    return found, cutoff
+
+
+@instrumented("dls")
 def dls(
     grid: Grid,
-    gui: GridGUI,
-    depth_limit: int,       
+    gui: Optional["SearchObserver"] = None,
+    depth_limit: int = 12,
     pause: float = 0.1,
+    complete: bool = False,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    start: Optional[Node] = None,
+    goal: Optional[Node] = None,
 ) -> List[Node]:
     """
-    Depth-Limited Search (recursive DFS up to a given depth).
+    Depth-Limited Search (DFS up to a given depth, explicit stack).
+    Pass ``gui=None`` to run headless.  ``complete=True`` re-expands
+    nodes reached at a shallower depth so no goal within the limit is
+    missed (see ``depth_limited_pass``).  ``stats`` (a SearchStats)
+    collects counters and phase timings, and ``cancel`` (a CancelToken)
+    stops the search from another thread.  ``start`` / ``goal`` default
+    to grid.start / grid.end.
     """
-    grid.clear_search_marks()
-    start, goal = grid.start, grid.end
-
-    parent: Dict[Node, Optional[Node]] = {start: None}
-    grid.mark_visit(start)
+    start = grid.start if start is None else start
+    goal = grid.end if goal is None else goal
+    if gui is not None:
+        with phase(stats, "reset"):
+            gui.on_clear(grid)
+    if depth_limit < 0 or not grid.components().connected(start, goal):
+        return []
 
-    found = _recursive_dls(grid, start, goal, depth_limit, parent, gui, pause)
+    s, t = grid.index(start), grid.index(goal)
+    with phase(stats, "search"):
+        state = grid.search_state()
+        state.begin()
+        state.visit(s, -1, 0)
+        found, _ = depth_limited_pass(
+            grid, s, t, depth_limit, state, gui, pause,
+            complete=complete, stats=stats, cancel=cancel,
+        )
 
     if not found:
         return []
 
-    path = reconstruct_path(parent, start, goal)
+    with phase(stats, "reconstruct"):
+        path = [grid.node(v) for v in reconstruct_path(state, s, t)]
     if not path:
         return []
 
-    for node in path:
-        if node not in (start, goal):
-            grid.grid[node] = Grid.PATH
-        gui.update(pause=pause)
+    if gui is not None:
+        for node in path:
+            gui.on_path(grid, node)
+            gui.update(pause=pause)
 
     return path
-
-
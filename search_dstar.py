@@ -0,0 +1,227 @@
+"""
+Incremental replanning with D* Lite (Koenig & Likhachev).
+
+The planner searches backwards from the goal and keeps its g / rhs values
+between calls.  When walls appear or disappear only the cells whose
+cost-to-goal actually changes are repaired, so replanning after a few
+wall toggles touches a small part of the map instead of re-running a
+full search.
+
+    planner = DStarLite(grid)
+    path = planner.plan()
+    planner.add_wall((4, 5))      # dynamic obstacle on the way
+    path = planner.plan()         # repaired, not recomputed
+    planner.move_start(path[1])   # the agent took a step
+
+Neighbours are generated from Grid.MOVES and the current walls on the
+fly, so a wall change does not force the CSR neighbour table to be
+rebuilt.  Step costs follow the grid's cost layer as it was when the
+planner was created.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+from grid_env import Grid
+
+Node = Tuple[int, int]
+
+INF = float("inf")
+
+
+class DStarLite:
+    """D* Lite planner from ``start`` (default grid.start) to ``goal``."""
+
+    def __init__(self, grid: Grid, start: Optional[Node] = None, goal: Optional[Node] = None):
+        self.grid = grid
+        self.start = grid.index(start if start is not None else grid.start)
+        self.goal = grid.index(goal if goal is not None else grid.end)
+
+        size = grid.rows * grid.cols
+        self._g = np.full(size, INF)
+        self._rhs = np.full(size, INF)
+        self.g = self._g.data
+        self.rhs = self._rhs.data
+
+        weights = grid.step_costs()
+        if weights is None:
+            self._cell_cost = None
+            self._diag_cost = 1
+            self._min_step = 1
+        else:
+            self._cell_cost = weights.cells
+            self._diag_cost = weights.diagonal_cost
+            self._min_step = float(grid.costs.min()) * min(1, weights.diagonal_cost)
+
+        # (dr, dc, id offset, diagonal?) for every move
+        self._moves = [
+            (dr, dc, dr * grid.cols + dc, dr != 0 and dc != 0) for dr, dc in Grid.MOVES
+        ]
+
+        self.km = 0.0
+        self._last = self.start
+        self._open: Dict[int, Tuple[float, float]] = {}
+        self._heap: List[Tuple[float, float, int]] = []
+        self.expanded = 0  # cells processed by the last plan()
+
+        self.rhs[self.goal] = 0.0
+        self._push(self.goal)
+
+    # ------------------------------------------------------------------
+    # public API
+    # ------------------------------------------------------------------
+    def plan(self) -> List[Node]:
+        """Bring the search up to date and return the current path."""
+        self.expanded = 0
+        grid = self.grid
+        if not grid.components().connected(grid.node(self.start), grid.node(self.goal)):
+            # pending repairs stay queued for the next plan
+            return []
+        self._compute_shortest_path()
+        return self.path()
+
+    def path(self) -> List[Node]:
+        """Greedy walk down the g values from start to goal ([] if blocked)."""
+        grid = self.grid
+        if self.g[self.start] == INF:
+            return []
+
+        path = [grid.node(self.start)]
+        cur = self.start
+        for _ in range(grid.rows * grid.cols):
+            if cur == self.goal:
+                return path
+            best, best_cost = -1, INF
+            for nbr, cost in self._successors(cur):
+                if cost + self.g[nbr] < best_cost:
+                    best, best_cost = nbr, cost + self.g[nbr]
+            if best < 0:
+                return []
+            cur = best
+            path.append(grid.node(cur))
+        return []
+
+    def add_wall(self, node: Node) -> None:
+        """Place a dynamic wall and mark the affected cells for repair."""
+        self.grid.add_dynamic_wall(node)
+        self._cell_changed(self.grid.index(node))
+
+    def remove_wall(self, node: Node) -> None:
+        """Remove a dynamic wall and mark the affected cells for repair."""
+        self.grid.remove_dynamic_wall(node)
+        self._cell_changed(self.grid.index(node))
+
+    def move_start(self, node: Node) -> None:
+        """The agent moved; later plans start from ``node``."""
+        new_start = self.grid.index(node)
+        self.km += self._h(self._last, new_start)
+        self._last = self.start = new_start
+
+    # ------------------------------------------------------------------
+    # D* Lite internals
+    # ------------------------------------------------------------------
+    def _is_wall(self, v: int) -> bool:
+        return not self.grid.is_free_id(v)
+
+    def _successors(self, u: int):
+        """(v, cost of u -> v) for every legal move out of ``u``."""
+        if self._is_wall(u):
+            return
+        rows, cols = self.grid.rows, self.grid.cols
+        r, c = divmod(u, cols)
+        for dr, dc, delta, diagonal in self._moves:
+            if 0 <= r + dr < rows and 0 <= c + dc < cols:
+                v = u + delta
+                if not self._is_wall(v):
+                    yield v, self._step_cost(v, diagonal)
+
+    def _predecessors(self, v: int):
+        """(u, cost of u -> v) for every legal move into ``v``."""
+        if self._is_wall(v):
+            return
+        rows, cols = self.grid.rows, self.grid.cols
+        r, c = divmod(v, cols)
+        for dr, dc, delta, diagonal in self._moves:
+            if 0 <= r - dr < rows and 0 <= c - dc < cols:
+                u = v - delta
+                if not self._is_wall(u):
+                    yield u, self._step_cost(v, diagonal)
+
+    def _neighbourhood(self, v: int):
+        """Every in-bounds cell that has, or could have, a move onto ``v``."""
+        rows, cols = self.grid.rows, self.grid.cols
+        r, c = divmod(v, cols)
+        for dr, dc, delta, _ in self._moves:
+            if 0 <= r - dr < rows and 0 <= c - dc < cols:
+                yield v - delta
+
+    def _step_cost(self, v: int, diagonal: bool) -> float:
+        cost = 1 if self._cell_cost is None else self._cell_cost[v]
+        return cost * self._diag_cost if diagonal else cost
+
+    def _h(self, a: int, b: int) -> float:
+        return self.grid.move_distance(self.grid.node(a), self.grid.node(b)) * self._min_step
+
+    def _key(self, s: int) -> Tuple[float, float]:
+        m = min(self.g[s], self.rhs[s])
+        return (m + self._h(self.start, s) + self.km, m)
+
+    def _push(self, s: int) -> None:
+        key = self._open[s] = self._key(s)
+        heapq.heappush(self._heap, (key[0], key[1], s))
+
+    def _refresh(self, s: int) -> None:
+        """Put ``s`` on the open list iff it is inconsistent."""
+        if self.g[s] != self.rhs[s]:
+            self._push(s)
+        else:
+            self._open.pop(s, None)
+
+    def _recompute_rhs(self, s: int) -> None:
+        if s != self.goal:
+            self.rhs[s] = min(
+                (cost + self.g[v] for v, cost in self._successors(s)), default=INF
+            )
+
+    def _cell_changed(self, v: int) -> None:
+        # moves out of v and into v changed: refresh v and everything around it
+        for s in (v, *self._neighbourhood(v)):
+            self._recompute_rhs(s)
+            self._refresh(s)
+
+    def _compute_shortest_path(self) -> None:
+        g, rhs, heap, open_ = self.g, self.rhs, self._heap, self._open
+        while heap:
+            k1, k2, u = heap[0]
+            if open_.get(u) != (k1, k2):
+                heapq.heappop(heap)  # stale entry
+                continue
+            if (k1, k2) >= self._key(self.start) and rhs[self.start] == g[self.start]:
+                break
+
+            heapq.heappop(heap)
+            new_key = self._key(u)
+            if (k1, k2) < new_key:
+                open_[u] = new_key
+                heapq.heappush(heap, (new_key[0], new_key[1], u))
+                continue
+
+            del open_[u]
+            self.expanded += 1
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                for p, cost in self._predecessors(u):
+                    if p != self.goal and cost + g[u] < rhs[p]:
+                        rhs[p] = cost + g[u]
+                        self._refresh(p)
+            else:
+                g_old = g[u]
+                g[u] = INF
+                for p, cost in self._predecessors(u):
+                    if rhs[p] == cost + g_old:
+                        self._recompute_rhs(p)
+                    self._refresh(p)
+                self._recompute_rhs(u)
+                self._refresh(u)
@@ -1,74 +1,88 @@
-from typing import Dict, Optional, Tuple, List
+from typing import TYPE_CHECKING, Optional, Tuple, List
 
 from grid_env import Grid
-from view_gui import GridGUI
-from search_utils import reconstruct_path
-
-Node = Tuple[int, int]
+from search_dls import depth_limited_pass
+from search_stats import SearchStats, instrumented, phase
+from search_utils import CancelToken, reconstruct_path
 
+if TYPE_CHECKING:
+    from search_observer import SearchObserver
 
-def _dls_step(
-    grid: Grid,
-    current: Node,
-    goal: Node,
-    depth_limit: int,
-    parent: Dict[Node, Optional[Node]],
-    gui: GridGUI,
-    pause: float,
-) -> bool:
-    if current not in (grid.start, grid.end):
-        grid.grid[current] = Grid.EXPLORED
-    gui.update(pause=pause)
-
-    if current == goal:
-        return True
-    if depth_limit == 0:
-        return False
-
-    for nbr in grid.neighbors(current):
-        if nbr not in parent:
-            parent[nbr] = current
-            grid.mark_visit(nbr)
-            if nbr not in (grid.start, grid.end):
-                grid.grid[nbr] = Grid.FRONTIER
-            gui.update(pause=pause)
-            if _dls_step(
-                    grid, nbr, goal, depth_limit - 1, parent, gui, pause
-            ):
-                return True
-    return False
+Node = Tuple[int, int]
 
 
+@instrumented("iddfs")
 def iddfs(
     grid: Grid,
-    gui: GridGUI,
+    gui: Optional["SearchObserver"] = None,
     max_depth: int = 20,
     pause: float = 0.1,
+    complete: bool = False,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    start: Optional[Node] = None,
+    goal: Optional[Node] = None,
 ) -> List[Node]:
     """
     Iterative Deepening Depth-First Search.
-    """
-    start, goal = grid.start, grid.end
+    Pass ``gui=None`` to run headless.
 
-    for depth in range(max_depth + 1):
-        grid.clear_search_marks()
-        parent: Dict[Node, Optional[Node]] = {start: None}
-        grid.mark_visit(start)
+    Headless runs skip depths that cannot change the outcome: they start
+    at the wall-free move distance to the goal and stop as soon as a pass
+    finishes without hitting the depth limit.  The returned path is the
+    same as running every depth from 0; with an observer every pass is
+    still animated.
 
-        found = _dls_step(grid, start, goal, depth, parent, gui, pause)
+    ``complete=True`` runs each pass with the best-depth table of
+    ``depth_limited_pass``, which makes the returned path a shortest one.
+
+    ``stats`` (a SearchStats) collects counters and phase timings, with
+    the expansions of each pass in ``stats.depth_expanded[depth]``.
+    ``cancel`` (a CancelToken) stops the search from another thread.
+    ``start`` / ``goal`` default to grid.start / grid.end.
+    """
+    start = grid.start if start is None else start
+    goal = grid.end if goal is None else goal
+    s, t = grid.index(start), grid.index(goal)
+    state = grid.search_state()
+
+    if not grid.components().connected(start, goal):
+        if gui is not None:
+            gui.on_clear(grid)
+        return []
+
+    first_depth = 0 if gui is not None else grid.move_distance(start, goal)
+
+    for depth in range(first_depth, max_depth + 1):
+        if gui is not None:
+            with phase(stats, "reset"):
+                gui.on_clear(grid)
+        with phase(stats, "search"):
+            # a new epoch per depth forgets the previous iteration without clearing
+            state.begin()
+            state.visit(s, -1, 0)
+            before = stats.expanded if stats is not None else 0
+            found, cutoff = depth_limited_pass(
+                grid, s, t, depth, state, gui, pause,
+                complete=complete, stats=stats, cancel=cancel,
+            )
+            if stats is not None:
+                stats.depth_expanded[depth] = stats.expanded - before
 
         if found:
-            path = reconstruct_path(parent, start, goal)
+            with phase(stats, "reconstruct"):
+                path = [grid.node(v) for v in reconstruct_path(state, s, t)]
             if not path:
                 return []
 
-            for node in path:
-                if node not in (start, goal):
-                    grid.grid[node] = Grid.PATH
-                gui.update(pause=pause)
+            if gui is not None:
+                for node in path:
+                    gui.on_path(grid, node)
+                    gui.update(pause=pause)
 
             return path
 
-    return []
-
+        if not cutoff and gui is None:
+            break
 
+    return []
@@ -0,0 +1,259 @@
+"""
+Jump-point pruning for unit-cost search, used by ``bfs(..., prune=True)``
+and ``ucs(..., prune=True)``.
+
+Grid.MOVES is a hexagonal lattice: listed by angle, the six moves form a
+ring D0..D5 where D(k-1) + D(k+1) == D(k) and D(k+3) == -D(k).  Shortest
+paths through open space therefore only use two neighbouring directions,
+and all orderings of those moves are equally short.  The ring is split
+into *primary* moves (up-left, right, down) and *secondary* moves (left,
+up, down-right), every secondary one lying between two primaries.  The
+canonical shortest path is "primary moves first, then secondary ones",
+exactly like diagonal-then-straight in square-grid JPS:
+
+- a secondary move only continues straight, unless a wall beside it
+  forces the turn to the neighbouring primary move;
+- a primary move continues straight or turns to one of its two
+  secondaries, and scans those at every step before moving on;
+- primary moves never have forced neighbours: the cells that would need
+  them are adjacent to the previous cell and reached from there.
+
+Only jump points (the start, the goal, cells with forced neighbours and
+turning points) enter the queue, and the parent links skip the straight
+runs between them.  ``reconstruct_path(..., cols=grid.cols)`` fills the
+skipped cells back in.  The scans themselves are precomputed per move
+(``jump_tables``), so each jump is O(1) instead of a walk along the ray.
+"""
+
+import heapq
+import weakref
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+from grid_env import Grid
+from search_stats import SearchStats
+from search_utils import CancelToken, SearchState
+
+if TYPE_CHECKING:
+    from search_observer import SearchObserver
+
+# Grid.MOVES in angular order
+RING = ((0, -1), (-1, -1), (-1, 0), (0, 1), (1, 1), (1, 0))
+PRIMARY = (False, True, False, True, False, True)
+DIRECTION = {move: k for k, move in enumerate(RING)}
+
+# grid -> (version, ray tables, padded free flags), see _tables
+_TABLES: "weakref.WeakKeyDictionary[Grid, Tuple[int, List[memoryview], memoryview]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def jump_point_search(
+    grid: Grid,
+    s: int,
+    t: int,
+    gui: Optional["SearchObserver"] = None,
+    pause: float = 0.1,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+) -> SearchState:
+    """
+    Unit-cost search from cell id ``s`` to ``t`` over jump points only.
+    Returns the grid's shared SearchState; ``dist`` holds step counts and
+    ``parent`` links jump points (see the module docstring).
+    """
+    cols = grid.cols
+    goal_r, goal_c = divmod(t, cols)
+    rays, padded = _tables(grid)
+    width = cols + 2
+    offsets = [dr * cols + dc for dr, dc in RING]
+
+    def free(r: int, c: int) -> bool:
+        # the padding ring is blocked, so no bounds check is needed
+        return padded[(r + 1) * width + c + 1]
+
+    def on_ray(gr: int, gc: int, dr: int, dc: int) -> int:
+        """m >= 1 with (gr, gc) == m * (dr, dc), else 0."""
+        if dr == 0:
+            m = gc * dc if gr == 0 else 0
+        elif dc == 0:
+            m = gr * dr if gc == 0 else 0
+        else:
+            m = gr * dr if gr * dr == gc * dc else 0
+        return m if m > 0 else 0
+
+    def jump(v: int, k: int) -> Tuple[int, int]:
+        """Next jump point (cell id, steps) along move k from v, or (-1, 0)."""
+        ahead = rays[k][v]
+        best = ahead if ahead > 0 else 0
+        reach = best or -ahead  # cells 1..reach along the move are free
+        dr, dc = RING[k]
+        r, c = divmod(v, cols)
+        gr, gc = goal_r - r, goal_c - c
+
+        m = on_ray(gr, gc, dr, dc)
+        if m and m <= reach:
+            best = m
+        if PRIMARY[k]:
+            # the goal can also sit on a secondary ray scanned on the way
+            for side in ((k - 1) % 6, (k + 1) % 6):
+                sr, sc = RING[side]
+                det = dr * sc - dc * sr  # +-1: neighbouring moves span the lattice
+                i = (gr * sc - gc * sr) // det
+                m = (dr * gc - dc * gr) // det
+                if 1 <= i <= reach and m >= 1 and (not best or i < best):
+                    side_ahead = rays[side][v + i * offsets[k]]
+                    if m <= abs(side_ahead):
+                        best = i
+        if best:
+            return v + best * offsets[k], best
+        return -1, 0
+
+    def forced(r: int, c: int, k: int) -> Tuple[bool, bool]:
+        """Forced turns (to k+1, to k-1) at (r, c) for a secondary move k."""
+        ar, ac = RING[(k + 2) % 6]
+        br, bc = RING[(k + 1) % 6]
+        cr, cc = RING[(k - 2) % 6]
+        dr, dc = RING[(k - 1) % 6]
+        return (
+            not free(r + ar, c + ac) and free(r + br, c + bc),
+            not free(r + cr, c + cc) and free(r + dr, c + dc),
+        )
+
+    def directions(v: int, p: int) -> List[int]:
+        if p < 0:
+            return list(range(6))
+        r, c = divmod(v, cols)
+        pr, pc = divmod(p, cols)
+        k = DIRECTION[((r > pr) - (r < pr), (c > pc) - (c < pc))]
+        if PRIMARY[k]:
+            return [k, (k - 1) % 6, (k + 1) % 6]
+        to_next, to_prev = forced(r, c, k)
+        out = [k]
+        if to_next:
+            out.append((k + 1) % 6)
+        if to_prev:
+            out.append((k - 1) % 6)
+        return out
+
+    state = grid.search_state()
+    epoch = state.begin()
+    seen, parent, dist = state.seen, state.parent, state.dist
+    state.visit(s, -1, 0)
+
+    pq: List[Tuple[int, int]] = [(0, s)]
+    track = stats is not None
+    expanded = generated = duplicates = max_frontier = 0
+    while pq:
+        if cancel is not None:
+            cancel.check()
+        if track:
+            max_frontier = max(max_frontier, len(pq))
+        d, v = heapq.heappop(pq)
+        if d > dist[v]:
+            continue  # stale entry
+        if track:
+            expanded += 1
+        if gui is not None:
+            gui.on_expand(grid, grid.node(v))
+        if v == t:
+            break
+
+        for k in directions(v, parent[v]):
+            nbr, steps = jump(v, k)
+            if nbr < 0:
+                continue
+            new_dist = d + steps
+            if seen[nbr] != epoch or new_dist < dist[nbr]:
+                if track:
+                    generated += 1
+                    duplicates += seen[nbr] == epoch
+                seen[nbr] = epoch
+                dist[nbr] = new_dist
+                parent[nbr] = v
+                heapq.heappush(pq, (new_dist, nbr))
+                if gui is not None:
+                    gui.on_discover(grid, grid.node(nbr))
+
+        if gui is not None:
+            gui.update(pause=pause)
+
+    if track:
+        stats.add(expanded, generated + 1, duplicates, max_frontier)
+    return state
+
+
+def jump_tables(grid: Grid) -> List[memoryview]:
+    """
+    Per-move ray tables, built with NumPy and cached until the walls
+    change.  ``rays[k][v] > 0`` is the number of steps along move k from
+    cell v to the first cell where the scan would stop (a forced turn for
+    secondary moves, a secondary scan that stops for primary ones);
+    otherwise ``-rays[k][v]`` is the number of free cells before a wall.
+    """
+    return _tables(grid)[0]
+
+
+def _tables(grid: Grid) -> Tuple[List[memoryview], memoryview]:
+    """The ray tables and the flat free flags padded by one blocked cell."""
+    cached = _TABLES.get(grid)
+    if cached is not None and cached[0] == grid.version:
+        return cached[1], cached[2]
+
+    rows, cols = grid.rows, grid.cols
+    dtype = np.int16 if max(rows, cols) < np.iinfo(np.int16).max else np.int32
+    free = np.zeros((rows + 2, cols + 2), dtype=bool)
+    free[1:-1, 1:-1] = grid.free_mask()
+    inner = free[1:-1, 1:-1]
+
+    def beside(k: int) -> np.ndarray:
+        dr, dc = RING[k]
+        return free[1 + dr : rows + 1 + dr, 1 + dc : cols + 1 + dc]
+
+    rays: List[Optional[np.ndarray]] = [None] * 6
+    for k in range(0, 6, 2):
+        stop = inner & (
+            (~beside((k + 2) % 6) & beside((k + 1) % 6))
+            | (~beside((k - 2) % 6) & beside((k - 1) % 6))
+        )
+        rays[k] = _sweep(free, stop, RING[k], dtype)
+    for k in range(1, 6, 2):
+        stop = inner & ((rays[k - 1] > 0) | (rays[(k + 1) % 6] > 0))
+        rays[k] = _sweep(free, stop, RING[k], dtype)
+
+    views = [table.reshape(-1).data for table in rays]
+    padded = free.reshape(-1).data
+    _TABLES[grid] = (grid.version, views, padded)
+    return views, padded
+
+
+def _sweep(free: np.ndarray, stop: np.ndarray, move: Tuple[int, int], dtype) -> np.ndarray:
+    """
+    Fill one ray table (see ``jump_tables``) by walking the grid against
+    the move one row or column at a time.  ``free`` is padded by one
+    blocked cell on each side, ``stop`` is not.
+    """
+    dr, dc = move
+    rows, cols = stop.shape
+    padded_stop = np.zeros(free.shape, dtype=bool)
+    padded_stop[1:-1, 1:-1] = stop
+    out = np.zeros(free.shape, dtype=dtype)
+
+    if dr != 0:
+        lines = range(rows, 0, -1) if dr > 0 else range(1, rows + 1)
+        for r in lines:
+            nxt = (r + dr, slice(1 + dc, cols + 1 + dc))
+            ahead = out[nxt]
+            out[r, 1:-1] = np.where(
+                ~free[nxt], 0, np.where(padded_stop[nxt], 1, np.where(ahead > 0, ahead + 1, ahead - 1))
+            )
+    else:
+        lines = range(cols, 0, -1) if dc > 0 else range(1, cols + 1)
+        for c in lines:
+            nxt = (slice(1, rows + 1), c + dc)
+            ahead = out[nxt]
+            out[1:-1, c] = np.where(
+                ~free[nxt], 0, np.where(padded_stop[nxt], 1, np.where(ahead > 0, ahead + 1, ahead - 1))
+            )
+    return out[1:-1, 1:-1].copy()
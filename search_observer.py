@@ -0,0 +1,49 @@
+"""
+Observer hooks for the search algorithms.
+
+Every search function takes an optional observer (the ``gui`` argument).
+When it is ``None`` the search runs headless: it does not touch the grid
+markings, does not assign visit labels and never redraws, so expansions
+run at plain Python speed.  GridGUI is just one observer implementation.
+
+This module must not import matplotlib.
+"""
+
+from typing import Tuple
+
+from grid_env import Grid
+
+Node = Tuple[int, int]
+
+
+class SearchObserver:
+    """
+    Base class for search observers.
+
+    The default hooks keep the grid markings (frontier / explored / path
+    and visit order) in sync, which is what the GUI draws.  Subclasses
+    override ``update`` to render a frame.
+    """
+
+    def on_clear(self, grid: Grid) -> None:
+        """A search (or an IDDFS pass) starts; drop the previous marks."""
+        grid.clear_search_marks()
+
+    def on_discover(self, grid: Grid, node: Node) -> None:
+        """A node was added to the frontier for the first time."""
+        grid.mark_visit(node)
+        if node not in (grid.start, grid.end):
+            grid.set_mark(node, Grid.FRONTIER)
+
+    def on_expand(self, grid: Grid, node: Node) -> None:
+        """A node was taken from the frontier and expanded."""
+        if node not in (grid.start, grid.end):
+            grid.set_mark(node, Grid.EXPLORED)
+
+    def on_path(self, grid: Grid, node: Node) -> None:
+        """A node belongs to the final path."""
+        if node not in (grid.start, grid.end):
+            grid.set_mark(node, Grid.PATH)
+
+    def update(self, pause: float = 0.1) -> None:
+        """End of a search step; nothing to draw by default."""
@@ -0,0 +1,111 @@
+"""
+Process-pool executor for independent path queries.
+
+The grid's walls are copied once into shared memory as a packed bitset;
+every worker attaches to it and wraps it in a lean Grid (see
+Grid.from_bits), so jobs only carry ``(algorithm, start, goal[, params])``
+and never pickle the grid.  A cost layer (Grid.set_costs) is shared the
+same way, as a second block, so weighted searches cost the same as in
+the parent.
+Results stream back in completion order.
+
+    with ParallelSearchExecutor(grid) as pool:
+        for job, path in pool.run([("bfs", (0, 0), (7, 7)), ...]):
+            ...
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+from grid_env import Grid
+from pathfinder import ALGORITHMS, find_path
+
+Node = Tuple[int, int]
+Job = Tuple[Any, ...]  # (algorithm, start, goal) or (algorithm, start, goal, params)
+
+# per-worker state, set up once by _init_worker
+_worker_grid: Optional[Grid] = None
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+_worker_cost_shm: Optional[shared_memory.SharedMemory] = None
+
+
+def _init_worker(shm_name: str, shape, costs=None) -> None:
+    """``costs`` is ``(shm_name, dtype, diagonal_cost)`` of a shared cost layer, or None."""
+    global _worker_grid, _worker_shm, _worker_cost_shm
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    size = (shape[0] * shape[1] + 7) // 8
+    bits = np.ndarray((size,), dtype=np.uint8, buffer=_worker_shm.buf)
+    bits.flags.writeable = False
+    _worker_grid = Grid.from_bits(bits, shape, start=(0, 0), end=(0, 0))
+    if costs is not None:
+        cost_name, dtype, diagonal_cost = costs
+        _worker_cost_shm = shared_memory.SharedMemory(name=cost_name)
+        layer = np.ndarray(tuple(shape), dtype=dtype, buffer=_worker_cost_shm.buf)
+        layer.flags.writeable = False
+        _worker_grid.set_costs(layer, diagonal_cost)
+
+
+def _run_job(job: Job) -> Tuple[Job, List[Node]]:
+    algorithm, start, goal = job[:3]
+    params: Dict[str, Any] = job[3] if len(job) > 3 else {}
+    _worker_grid.start, _worker_grid.end = tuple(start), tuple(goal)
+    return job, find_path(_worker_grid, algorithm, **params)
+
+
+class ParallelSearchExecutor:
+    """
+    Runs path queries against one fixed grid in a pool of worker processes.
+
+    The walls and costs are snapshotted when the executor is created;
+    later changes to the grid are not seen by the workers.
+    """
+
+    def __init__(self, grid: Grid, processes: Optional[int] = None):
+        bits = grid.walls if grid.lean else np.packbits(~grid.free_mask().ravel())
+        self._shm = shared_memory.SharedMemory(create=True, size=max(bits.nbytes, 1))
+        shared = np.ndarray(bits.shape, dtype=np.uint8, buffer=self._shm.buf)
+        shared[:] = bits
+
+        # set_costs keeps the layer as contiguous uint16 or float32
+        self._cost_shm: Optional[shared_memory.SharedMemory] = None
+        costs = None
+        if grid.costs is not None:
+            layer = grid.costs
+            self._cost_shm = shared_memory.SharedMemory(create=True, size=max(layer.nbytes, 1))
+            np.ndarray(layer.shape, dtype=layer.dtype, buffer=self._cost_shm.buf)[:] = layer
+            costs = (self._cost_shm.name, layer.dtype.str, grid.diagonal_cost)
+
+        self._pool = multiprocessing.Pool(
+            processes,
+            initializer=_init_worker,
+            initargs=(self._shm.name, (grid.rows, grid.cols), costs),
+        )
+
+    def run(self, jobs: Iterable[Job], chunksize: int = 1) -> Iterator[Tuple[Job, List[Node]]]:
+        """
+        Fan the jobs out to the pool and yield ``(job, path)`` pairs as
+        they complete (not in submission order).
+        """
+        jobs = list(jobs)
+        for job in jobs:
+            if job[0] not in ALGORITHMS:
+                raise ValueError(f"unknown algorithm: {job[0]!r}")
+        return self._pool.imap_unordered(_run_job, jobs, chunksize)
+
+    def close(self) -> None:
+        """Stop the workers and release the shared grid."""
+        self._pool.close()
+        self._pool.join()
+        for shm in (self._shm, self._cost_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def __enter__(self) -> "ParallelSearchExecutor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
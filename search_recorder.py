@@ -0,0 +1,247 @@
+"""
+Record a search now, animate it later.
+
+SearchRecorder is a search observer that never draws: ``update`` only
+closes a step, so the search runs at headless speed whatever the frame
+rate.  Every hook is stored as one compact delta
+
+    (cell id, new cell code, visit number, step)
+
+in a fixed-size ring buffer (13 bytes per delta).  When the buffer is
+full the oldest deltas are folded into a base snapshot, so playback
+starts from the state at the beginning of the retained window instead of
+from an empty grid.
+
+    recorder = SearchRecorder()
+    path = bfs(grid, recorder)                  # full speed
+    recorder.play(fps=20)                       # GridGUI window
+    recorder.save("bfs.gif", fps=20)            # or .mp4 (needs ffmpeg)
+
+Playback and export import matplotlib lazily; recording does not.
+"""
+
+from typing import TYPE_CHECKING, Iterator, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+from grid_env import Grid
+from search_observer import SearchObserver
+
+if TYPE_CHECKING:
+    from view_gui import GridGUI
+
+Node = Tuple[int, int]
+
+# cell id of a delta that stands for ``on_clear`` (all marks dropped)
+CLEARED = -1
+
+
+class SearchRecorder(SearchObserver):
+    """
+    Observer that records per-step deltas into a ring buffer of
+    ``capacity`` deltas; see the module docstring.  The recorded grid
+    still gets the usual marks, exactly as under a GUI.
+    """
+
+    def __init__(self, capacity: int = 1 << 20):
+        if capacity < 4:
+            raise ValueError("capacity must be at least 4")
+        self.capacity = capacity
+        self.cell = np.empty(capacity, dtype=np.int32)
+        self.state = np.empty(capacity, dtype=np.int8)
+        self.visit = np.empty(capacity, dtype=np.int32)
+        self.step = np.empty(capacity, dtype=np.int32)
+        self.grid: Optional[Grid] = None
+        self._base: Optional[Grid] = None  # replay start, see _fold
+        self._first = 0  # absolute index of the oldest retained delta
+        self._count = 0  # deltas recorded so far
+        self._step = 0
+
+    def __len__(self) -> int:
+        """Number of retained deltas."""
+        return self._count - self._first
+
+    @property
+    def steps(self) -> int:
+        """Number of closed steps (``update`` calls) recorded."""
+        return self._step
+
+    # ------------------------------------------------------------------
+    # recording
+    # ------------------------------------------------------------------
+    def _attach(self, grid: Grid) -> None:
+        if self.grid is None:
+            self.grid = grid
+            self._base = _copy_grid(grid)
+        elif grid is not self.grid:
+            raise ValueError("a SearchRecorder records a single grid")
+
+    def _record(self, cell: int, state: int, visit: int) -> None:
+        if self._count - self._first == self.capacity:
+            self._fold(self.capacity // 4)
+        i = self._count % self.capacity
+        self.cell[i] = cell
+        self.state[i] = state
+        self.visit[i] = visit
+        self.step[i] = self._step
+        self._count += 1
+
+    def _record_node(self, grid: Grid, node: Node) -> None:
+        r, c = node
+        self._record(r * grid.cols + c, grid.grid[r, c], grid.visit_order[r, c])
+
+    def _fold(self, n: int) -> None:
+        """Apply the ``n`` oldest deltas to the base snapshot and drop them."""
+        for i in range(self._first, self._first + n):
+            _apply(self._base, self, i % self.capacity)
+        self._first += n
+
+    def on_clear(self, grid: Grid) -> None:
+        self._attach(grid)
+        super().on_clear(grid)
+        self._record(CLEARED, Grid.EMPTY, -1)
+
+    def on_discover(self, grid: Grid, node: Node) -> None:
+        self._attach(grid)
+        super().on_discover(grid, node)
+        self._record_node(grid, node)
+
+    def on_expand(self, grid: Grid, node: Node) -> None:
+        self._attach(grid)
+        super().on_expand(grid, node)
+        self._record_node(grid, node)
+
+    def on_path(self, grid: Grid, node: Node) -> None:
+        self._attach(grid)
+        super().on_path(grid, node)
+        self._record_node(grid, node)
+
+    def update(self, pause: float = 0.1) -> None:
+        """Close the current step; ``pause`` is ignored while recording."""
+        self._step += 1
+
+    # ------------------------------------------------------------------
+    # playback
+    # ------------------------------------------------------------------
+    def frames(self, steps_per_frame: int = 1) -> Iterator[Grid]:
+        """
+        Replay the retained deltas on a private copy of the grid and yield
+        it after every ``steps_per_frame`` steps (and once at the end).
+        The same Grid object is yielded every time, updated in place.
+        """
+        if self._base is None:
+            return
+        steps_per_frame = max(1, steps_per_frame)
+        grid = _copy_grid(self._base)
+        yield grid
+        shown = None
+        for k in range(self._first, self._count):
+            i = k % self.capacity
+            step = self.step[i] // steps_per_frame
+            if shown is not None and step != shown:
+                yield grid
+            shown = step
+            _apply(grid, self, i)
+        if shown is not None:
+            yield grid
+
+    def play(
+        self,
+        fps: float = 20.0,
+        steps_per_frame: int = 1,
+        title: str = "AIPathFinder",
+    ) -> "GridGUI":
+        """
+        Animate the recording in a new GridGUI window at ``fps`` frames per
+        second and return the GUI (e.g. for ``block_until_closed``).
+        """
+        from view_gui import GridGUI
+
+        frames = self.frames(steps_per_frame)
+        first = next(frames, None)
+        if first is None:
+            raise ValueError("nothing recorded")
+        gui = GridGUI(first, title=title)
+        gui.show_initial()
+        for _ in frames:
+            gui.update(pause=1.0 / fps)
+        return gui
+
+    def save(
+        self,
+        path: str,
+        fps: float = 20.0,
+        steps_per_frame: int = 1,
+        title: str = "AIPathFinder",
+        dpi: int = 100,
+    ) -> None:
+        """
+        Export the recording as a GIF (Pillow) or, for any other file
+        extension, a video through ffmpeg.  GIF frames are taken from the
+        incrementally painted canvas; the ffmpeg writer redraws every
+        frame in full, so prefer a larger ``steps_per_frame`` there.
+        """
+        import matplotlib.pyplot as plt  # type: ignore
+        from matplotlib import animation  # type: ignore
+
+        from view_gui import GridGUI
+
+        frames = self.frames(steps_per_frame)
+        first = next(frames, None)
+        if first is None:
+            raise ValueError("nothing recorded")
+        gui = GridGUI(first, title=title)
+        gui.fig.set_dpi(dpi)
+        try:
+            if path.lower().endswith(".gif"):
+                _save_gif(gui, frames, path, fps)
+                return
+            writer = animation.FFMpegWriter(fps=fps)
+            with writer.saving(gui.fig, path, dpi):
+                gui.update(pause=0)
+                writer.grab_frame()
+                for _ in frames:
+                    gui.update(pause=0)
+                    writer.grab_frame()
+        finally:
+            plt.close(gui.fig)
+
+
+def _save_gif(gui: "GridGUI", frames: Iterator[Grid], path: str, fps: float) -> None:
+    from PIL import Image  # type: ignore  # a matplotlib dependency
+
+    def grab() -> "Image.Image":
+        pixels = np.asarray(gui.fig.canvas.buffer_rgba())
+        return Image.fromarray(pixels[:, :, :3]).quantize(colors=64)
+
+    gui.update(pause=0)
+    images = [grab()]
+    for _ in frames:
+        gui.update(pause=0)
+        images.append(grab())
+    images[0].save(
+        path, save_all=True, append_images=images[1:],
+        duration=round(1000 / fps), loop=0,
+    )
+
+
+def _copy_grid(grid: Grid) -> Grid:
+    """Detached copy of the cell codes and visit labels of ``grid``."""
+    copy = Grid.from_array(grid.grid.copy(), grid.start, grid.end)
+    copy.visit_order[...] = grid.visit_order
+    copy._visit_counter = grid._visit_counter
+    copy._touched = list(grid._touched)
+    return copy
+
+
+def _apply(grid: Grid, recorder: SearchRecorder, i: int) -> None:
+    """Apply delta ``i`` of ``recorder`` to ``grid``."""
+    cell = int(recorder.cell[i])
+    if cell == CLEARED:
+        grid.clear_search_marks()
+        return
+    node = divmod(cell, grid.cols)
+    grid.grid[node] = recorder.state[i]
+    grid.visit_order[node] = visit = recorder.visit[i]
+    grid._visit_counter = max(grid._visit_counter, int(visit) + 1)
+    grid._touched.append(node)
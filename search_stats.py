@@ -0,0 +1,188 @@
+"""
+Optional per-search instrumentation.
+
+Every search takes ``stats=None``.  Pass a SearchStats to have it filled
+with what the search did:
+
+- ``expanded``: nodes taken off the frontier and expanded;
+- ``generated``: nodes put on the frontier (the start included);
+- ``max_frontier``: largest frontier (queue / stack / heap) size seen;
+- ``duplicates``: pushes of a node already on the frontier (UCS and the
+  other priority-queue searches);
+- ``depth_expanded``: IDDFS expansions per depth limit;
+- ``extra``: algorithm specific counts (e.g. per side for bidirectional);
+- ``phases``: seconds spent in ``reset`` (clearing the previous marks),
+  ``search``, ``reconstruct`` and ``render`` (inside observer callbacks,
+  excluded from the other phases).
+
+With ``stats=None`` no counter or timer runs at all.  Finished records are
+passed to ``stats.sink`` and to every function registered with
+``add_sink``, e.g. to forward them to a metrics backend:
+
+    add_sink(lambda s: log.info("search %s", s.as_dict()))
+    path = find_path(grid, "ucs", stats=SearchStats())
+"""
+
+import functools
+import inspect
+import time
+from contextlib import contextmanager, nullcontext
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from grid_env import Grid
+    from search_observer import SearchObserver
+
+Sink = Callable[["SearchStats"], None]
+
+_SINKS: List[Sink] = []
+
+
+def add_sink(sink: Sink) -> None:
+    """Call ``sink(stats)`` after every instrumented search."""
+    _SINKS.append(sink)
+
+
+def remove_sink(sink: Sink) -> None:
+    _SINKS.remove(sink)
+
+
+class SearchStats:
+    """Counters and phase timings of one search, see the module docstring."""
+
+    def __init__(self, sink: Optional[Sink] = None):
+        self.sink = sink
+        self.algorithm = ""
+        self._clear()
+
+    def _clear(self) -> None:
+        self.expanded = 0
+        self.generated = 0
+        self.max_frontier = 0
+        self.duplicates = 0
+        self.depth_expanded: Dict[int, int] = {}
+        self.extra: Dict[str, int] = {}
+        self.phases: Dict[str, float] = {}
+        self.path_length: Optional[int] = None
+        self._render = 0.0
+
+    def begin(self, algorithm: str) -> None:
+        """Reset the record for a new search."""
+        self.algorithm = algorithm
+        self._clear()
+
+    def add(self, expanded: int = 0, generated: int = 0, duplicates: int = 0,
+            max_frontier: int = 0) -> None:
+        """Merge the local counters of one search loop."""
+        self.expanded += expanded
+        self.generated += generated
+        self.duplicates += duplicates
+        self.max_frontier = max(self.max_frontier, max_frontier)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block, minus the observer time spent inside it."""
+        t0 = time.perf_counter()
+        render0 = self._render
+        try:
+            yield
+        finally:
+            own = time.perf_counter() - t0 - (self._render - render0)
+            self.phases[name] = self.phases.get(name, 0.0) + own
+
+    def observe(self, gui: Optional["SearchObserver"]) -> Optional["SearchObserver"]:
+        """Wrap an observer so the time spent in it counts as ``render``."""
+        return None if gui is None else _TimedObserver(gui, self)
+
+    def finish(self, path: List) -> None:
+        """Close the record and hand it to the sinks."""
+        self.path_length = len(path) - 1 if path else None
+        if self._render:
+            self.phases["render"] = self._render
+        if self.sink is not None:
+            self.sink(self)
+        for sink in _SINKS:
+            sink(self)
+
+    def as_dict(self) -> Dict:
+        return {
+            "algorithm": self.algorithm,
+            "expanded": self.expanded,
+            "generated": self.generated,
+            "max_frontier": self.max_frontier,
+            "duplicates": self.duplicates,
+            "depth_expanded": dict(self.depth_expanded),
+            "extra": dict(self.extra),
+            "phases": dict(self.phases),
+            "path_length": self.path_length,
+        }
+
+    def __repr__(self) -> str:
+        return f"SearchStats({self.as_dict()!r})"
+
+
+def phase(stats: Optional[SearchStats], name: str):
+    """``stats.phase(name)``, or a no-op context when stats are off."""
+    return stats.phase(name) if stats is not None else nullcontext()
+
+
+def instrumented(algorithm: str):
+    """
+    Decorator for the public search functions: when called with a
+    SearchStats (by keyword or position) it starts the record, times the
+    observer and finishes the record with the returned path.  Without
+    stats it adds one dict lookup.
+    """
+
+    def wrap(search):
+        signature = inspect.signature(search)
+        position = list(signature.parameters).index("stats")
+
+        @functools.wraps(search)
+        def run(*args, **kwargs):
+            stats = kwargs.get("stats")
+            if stats is None and len(args) > position:
+                stats = args[position]
+            if stats is None:
+                return search(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            stats.begin(algorithm)
+            if bound.arguments.get("gui") is not None:
+                bound.arguments["gui"] = stats.observe(bound.arguments["gui"])
+            path = search(*bound.args, **bound.kwargs)
+            stats.finish(path)
+            return path
+
+        return run
+
+    return wrap
+
+
+class _TimedObserver:
+    """Forwards observer callbacks and adds their time to ``render``."""
+
+    def __init__(self, gui: "SearchObserver", stats: SearchStats):
+        self._gui = gui
+        self._stats = stats
+
+    def _timed(self, hook, *args, **kwargs) -> None:
+        t0 = time.perf_counter()
+        hook(*args, **kwargs)
+        self._stats._render += time.perf_counter() - t0
+
+    def on_clear(self, grid: "Grid") -> None:
+        # counted in the "reset" phase, not as rendering
+        self._gui.on_clear(grid)
+
+    def on_discover(self, grid: "Grid", node) -> None:
+        self._timed(self._gui.on_discover, grid, node)
+
+    def on_expand(self, grid: "Grid", node) -> None:
+        self._timed(self._gui.on_expand, grid, node)
+
+    def on_path(self, grid: "Grid", node) -> None:
+        self._timed(self._gui.on_path, grid, node)
+
+    def update(self, pause: float = 0.1) -> None:
+        self._timed(self._gui.update, pause=pause)
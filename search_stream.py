@@ -0,0 +1,299 @@
+"""
+Searches as generators of events, with cancellation and budgets.
+
+    stream = SearchStream(grid, "dfs", max_nodes=50_000, time_limit=0.05)
+    for event in stream:
+        if event.kind == "expand":
+            ...
+    if stream.status == "suspended":        # a budget ran out
+        stream.resume(max_nodes=50_000)     # grant more and go on
+        for event in stream:
+            ...
+    path = stream.path
+
+Any algorithm of pathfinder.ALGORITHMS can be streamed.  The events are
+``clear`` / ``discover`` / ``expand`` / ``path`` (one per observer hook,
+with its node), then one final ``done`` (carrying the path), ``suspended``
+or ``cancelled``.
+
+The search functions are not changed: the search runs in a helper thread
+with an internal observer, which hands control to the consumer every
+``batch`` events and waits to be handed back.  The search and the
+consumer never run at the same time, and a stream that is not iterated
+does not advance.  Budgets and ``cancel()`` are checked in the hooks, so
+a search stops within one expansion; a cancelled search is unwound with
+an exception that never leaves this module.  Breaking out of the loop
+only pauses the stream: iterate it again to go on, or ``close()`` it (or
+use it as a context manager) to cancel it and release the thread; a
+stream that is simply dropped is cancelled when it is garbage collected.
+
+While a stream is paused or suspended, its search holds the grid's shared
+search state, so do not search the grid or edit its walls until the
+stream has finished.  As the search runs with an observer it takes the
+observer code paths (no vectorised or pruned BFS).
+"""
+
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from grid_env import Grid
+from pathfinder import ALGORITHMS, find_path
+from search_observer import SearchObserver
+
+Node = Tuple[int, int]
+
+INF = float("inf")
+
+
+class SearchEvent(NamedTuple):
+    """One event of a stream; ``path`` is only set on the ``done`` event."""
+
+    kind: str
+    node: Optional[Node] = None
+    path: Optional[List[Node]] = None
+
+
+class _Cancelled(Exception):
+    """Unwinds the search thread of a cancelled stream."""
+
+
+class SearchStream:
+    """
+    One search run as an iterable of SearchEvent, see the module docstring.
+
+    ``status`` is ``pending`` until the first event is requested, then
+    ``running``, and ends as ``done``, ``cancelled`` or ``failed`` (the
+    search raised; iterating re-raises the error).  ``suspended`` means a
+    budget ran out (``reason`` says which) and ``resume`` can continue.
+    ``observer`` (e.g. a GridGUI) still gets every hook; without one the
+    grid is not marked.
+    """
+
+    def __init__(
+        self,
+        grid: Grid,
+        algorithm: str = "bfs",
+        observer: Optional[SearchObserver] = None,
+        max_nodes: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        batch: int = 256,
+        **params: Any,
+    ):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"unknown algorithm: {algorithm!r}")
+        if batch < 1:
+            raise ValueError("batch must be at least 1")
+        self.grid = grid
+        self.algorithm = algorithm
+        self.observer = observer
+        self.batch = batch
+        self.params = params
+
+        self._max_nodes = max_nodes
+        self._time_limit = time_limit
+        # the thread only references the _Search, so this stream can be
+        # collected while the search is paused in one of its hooks
+        self._search = _Search(grid, algorithm, observer, batch, params)
+        weakref.finalize(self, self._search.abandon)
+
+    @property
+    def status(self) -> str:
+        return self._search.status
+
+    @property
+    def reason(self) -> Optional[str]:
+        """Why a suspended search stopped: "nodes" or "time"."""
+        return self._search.reason
+
+    @property
+    def expanded(self) -> int:
+        return self._search.expanded
+
+    @property
+    def path(self) -> Optional[List[Node]]:
+        return self._search.path
+
+    # ------------------------------------------------------------------
+    # consumer side
+    # ------------------------------------------------------------------
+    def __iter__(self) -> Iterator[SearchEvent]:
+        search = self._search
+        while True:
+            while search.events:
+                yield search.events.popleft()
+            if search.status == "failed":
+                raise search.error
+            if search.status in ("done", "cancelled"):
+                return
+            if search.status == "suspended" and not search.cancelled:
+                return
+            self._switch()
+
+    def __enter__(self) -> "SearchStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def cancel(self) -> None:
+        """
+        Ask the search to stop; safe from any thread.  A running search
+        stops at its next hook, a paused or suspended one when the stream
+        is next iterated (or closed).
+        """
+        self._search.cancelled = True
+
+    def close(self) -> None:
+        """Cancel the search and wait until its thread has finished."""
+        self.cancel()
+        if self.status != "failed":
+            for _ in self:
+                pass
+
+    def resume(self, max_nodes: Optional[int] = None, time_limit: Optional[float] = None) -> None:
+        """
+        Replace the budgets (None = unlimited) of a suspended, paused or
+        not yet started search, counted from now; iterate again to go on.
+        """
+        search = self._search
+        if search.status not in ("pending", "running", "suspended"):
+            raise ValueError(f"cannot resume a {search.status} search")
+        self._max_nodes, self._time_limit = max_nodes, time_limit
+        if search.status == "suspended":
+            search.status, search.reason = "running", None
+        if search.thread is not None:
+            self._arm()
+
+    def _arm(self) -> None:
+        """Start the budgets of the next stretch of search."""
+        search = self._search
+        search.node_limit = INF if self._max_nodes is None else search.expanded + self._max_nodes
+        search.deadline = INF if self._time_limit is None else time.perf_counter() + self._time_limit
+
+    def _switch(self) -> None:
+        """Hand control to the search thread and wait until it hands back."""
+        search = self._search
+        if search.thread is None:
+            if search.cancelled:
+                search.finish("cancelled")
+                return
+            search.status = "running"
+            self._arm()
+            search.thread = threading.Thread(
+                target=search.run, name=f"search-stream-{self.algorithm}", daemon=True
+            )
+            search.thread.start()
+        else:
+            search.to_search.release()
+        search.to_consumer.acquire()
+
+
+class _Search(SearchObserver):
+    """
+    The search side of a SearchStream: the observer its thread runs with,
+    and the state the two sides hand back and forth.
+    """
+
+    def __init__(
+        self,
+        grid: Grid,
+        algorithm: str,
+        observer: Optional[SearchObserver],
+        batch: int,
+        params: Dict[str, Any],
+    ):
+        self.grid = grid
+        self.algorithm = algorithm
+        self.observer = observer
+        self.batch = batch
+        self.params = params
+
+        self.status = "pending"
+        self.reason: Optional[str] = None
+        self.expanded = 0
+        self.path: Optional[List[Node]] = None
+        self.error: Optional[BaseException] = None
+
+        self.node_limit = INF
+        self.deadline = INF
+        self.events: Deque[SearchEvent] = deque()
+        self.cancelled = False
+        self.thread: Optional[threading.Thread] = None
+        self.to_search = threading.Semaphore(0)
+        self.to_consumer = threading.Semaphore(0)
+
+    def abandon(self) -> None:
+        """The stream is gone: cancel, and wake the thread if it is paused."""
+        self.cancelled = True
+        if self.thread is not None and self.thread.is_alive():
+            self.to_search.release()
+
+    def run(self) -> None:
+        try:
+            path = find_path(self.grid, self.algorithm, self, **self.params)
+        except _Cancelled:
+            self.finish("cancelled")
+        except BaseException as exc:
+            self.error = exc
+            self.status = "failed"
+        else:
+            self.path = path
+            self.finish("done", path)
+        finally:
+            self.to_consumer.release()
+
+    def finish(self, status: str, path: Optional[List[Node]] = None) -> None:
+        self.status = status
+        self.events.append(SearchEvent(status, path=path))
+
+    def _pause(self) -> None:
+        """Hand control to the consumer and wait until it hands back."""
+        self.to_consumer.release()
+        self.to_search.acquire()
+        if self.cancelled:
+            raise _Cancelled
+
+    def _emit(self, kind: str, node: Optional[Node]) -> None:
+        if self.cancelled:
+            raise _Cancelled
+        self.events.append(SearchEvent(kind, node))
+        if len(self.events) >= self.batch:
+            self._pause()
+
+    def on_clear(self, grid: Grid) -> None:
+        if self.observer is not None:
+            self.observer.on_clear(grid)
+        self._emit("clear", None)
+
+    def on_discover(self, grid: Grid, node: Node) -> None:
+        if self.observer is not None:
+            self.observer.on_discover(grid, node)
+        self._emit("discover", node)
+
+    def on_expand(self, grid: Grid, node: Node) -> None:
+        if self.cancelled:
+            raise _Cancelled
+        # suspend before the expansion that would exceed a budget
+        while self.expanded >= self.node_limit or (
+            self.deadline != INF and time.perf_counter() >= self.deadline
+        ):
+            self.reason = "nodes" if self.expanded >= self.node_limit else "time"
+            self.status = "suspended"
+            self.events.append(SearchEvent("suspended"))
+            self._pause()
+        self.expanded += 1
+        if self.observer is not None:
+            self.observer.on_expand(grid, node)
+        self._emit("expand", node)
+
+    def on_path(self, grid: Grid, node: Node) -> None:
+        if self.observer is not None:
+            self.observer.on_path(grid, node)
+        self._emit("path", node)
+
+    def update(self, pause: float = 0.1) -> None:
+        if self.observer is not None:
+            self.observer.update(pause)
@@ -1,60 +1,305 @@
 import heapq
-from typing import Dict, Optional, Tuple, List
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple, List
 
-from grid_env import Grid
-from view_gui import GridGUI
-from search_utils import reconstruct_path
+from grid_env import Grid, StepCosts
+from search_jps import jump_point_search
+from search_stats import SearchStats, instrumented, phase
+from search_utils import CancelToken, SearchState, next_goal, reconstruct_path
+
+if TYPE_CHECKING:
+    from search_observer import SearchObserver
 
 Node = Tuple[int, int]
 
+# Edge costs up to this bound use the bucket queue; above it (or for
+# non-integer costs) the binary heap is cheaper.
+MAX_BUCKET_COST = 64
+
 
+@instrumented("ucs")
 def ucs(
     grid: Grid,
-    gui: GridGUI,
+    gui: Optional["SearchObserver"] = None,
     pause: float = 0.1,
+    frontier: Optional[str] = None,
+    prune: bool = False,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    start: Optional[Node] = None,
+    goal: Optional[Node] = None,
 ) -> List[Node]:
     """
-    Uniform-Cost Search with unit step cost (like Dijkstra's algorithm).
+    Uniform-Cost Search (like Dijkstra's algorithm).  Step costs come from
+    the grid's cost layer (see Grid.set_costs), unit cost when none is set.
+    Pass ``gui=None`` to run headless.
+
+    ``frontier`` picks the priority queue: "bucket" (Dial's algorithm,
+    one bucket per cost value) or "heap" (heapq).  By default the bucket
+    queue is used whenever all step costs are small integers.  Both find
+    an optimal path; ties between equal-cost paths may differ.
+
+    ``prune=True`` runs jump-point search instead (see search_jps); it
+    needs unit step costs and raises ValueError on a weighted grid.
+
+    ``stats`` (a SearchStats) collects counters and phase timings.
+    ``cancel`` (a CancelToken) stops the search from another thread.
+    ``start`` / ``goal`` default to grid.start / grid.end.
+    """
+    if prune and grid.step_costs() is not None:
+        raise ValueError("jump-point pruning needs unit step costs")
+
+    start = grid.start if start is None else start
+    goal = grid.end if goal is None else goal
+    s, t = grid.index(start), grid.index(goal)
+    if gui is not None:
+        with phase(stats, "reset"):
+            gui.on_clear(grid)
+    if not grid.components().connected(start, goal):
+        return []
+
+    with phase(stats, "search"):
+        if prune:
+            state = jump_point_search(grid, s, t, gui, pause, stats, cancel)
+        else:
+            state = _ucs(grid, s, t, gui, pause, frontier, stats, cancel)
+    with phase(stats, "reconstruct"):
+        cols = grid.cols if prune else None
+        path = [grid.node(v) for v in reconstruct_path(state, s, t, cols=cols)]
+    if not path:
+        return []
+
+    if gui is not None:
+        for node in path:
+            gui.on_path(grid, node)
+            gui.update(pause=pause)
+
+    return path
+
+
+def ucs_tree(
+    grid: Grid,
+    source: int,
+    goal: int = -1,
+    frontier: Optional[str] = None,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    goals: Optional[Sequence[int]] = None,
+) -> SearchState:
+    """
+    Headless UCS from cell id ``source``.  Stops once ``goal`` is expanded,
+    or settles the whole reachable region when ``goal`` is -1.  ``goals``
+    (cell ids) replaces ``goal``: the sweep stops once every one of them
+    has its final cost or the region is exhausted.
+
+    Returns the grid's shared SearchState (valid until the next search);
+    path costs are in ``dist`` with unit costs, else in ``path_costs()``.
     """
-    grid.clear_search_marks()
-    start, goal = grid.start, grid.end
+    if goals is not None:
+        goals = list(goals)
+        goal = goals[-1] if goals else source
+    return _ucs(grid, source, goal, None, 0.0, frontier, stats, cancel, goals)
+
+
+def _ucs(
+    grid: Grid,
+    s: int,
+    t: int,
+    gui: Optional["SearchObserver"],
+    pause: float,
+    frontier: Optional[str],
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    goals: Optional[List[int]] = None,
+) -> SearchState:
+    weights = grid.step_costs()
+    if weights is None:
+        integral, max_cost = True, 1
+    else:
+        integral, max_cost = weights.integral, weights.max_step
 
-    pq: List[Tuple[int, Node]] = []
-    heapq.heappush(pq, (0, start))
+    if frontier is None:
+        frontier = "bucket" if integral and max_cost <= MAX_BUCKET_COST else "heap"
 
-    parent: Dict[Node, Optional[Node]] = {start: None}
-    cost_so_far: Dict[Node, int] = {start: 0}
-    grid.mark_visit(start)
+    if frontier == "bucket":
+        if not integral:
+            raise ValueError("the bucket frontier needs integer step costs")
+        return _ucs_buckets(grid, s, t, gui, pause, weights, int(max_cost), stats, cancel, goals)
+    if frontier == "heap":
+        return _ucs_heap(grid, s, t, gui, pause, weights, stats, cancel, goals)
+    raise ValueError(f"unknown UCS frontier: {frontier!r}")
+
+
+def _ucs_heap(
+    grid: Grid,
+    s: int,
+    t: int,
+    gui: Optional["SearchObserver"],
+    pause: float,
+    weights: Optional[StepCosts],
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    goals: Optional[List[int]] = None,
+) -> SearchState:
+    offsets, targets = grid.adjacency()
+
+    state = grid.search_state()
+    epoch = state.begin()
+    seen, parent, cost_so_far = state.seen, state.parent, state.dist
+    state.visit(s, -1, 0)
+    cell_cost, diag_step, diag_cost = _unpack(weights)
+    if cell_cost is not None:
+        cost_so_far = state.path_costs()
+        cost_so_far[s] = 0
+
+    # row-major ids keep the (cost, (row, col)) tie-breaking of tuple nodes
+    pq: List[Tuple[float, int]] = []
+    heapq.heappush(pq, (0, s))
+    track = stats is not None
+    expanded = generated = duplicates = max_frontier = 0
 
     while pq:
+        if cancel is not None:
+            cancel.check()
+        if track:
+            max_frontier = max(max_frontier, len(pq))
         current_cost, current = heapq.heappop(pq)
-        if current not in (start, goal):
-            grid.grid[current] = Grid.EXPLORED
+        if current_cost > cost_so_far[current]:
+            continue  # stale entry, a cheaper one was already expanded
+        if track:
+            expanded += 1
+        if gui is not None:
+            gui.on_expand(grid, grid.node(current))
 
-        if current == goal:
-            break
+        if current == t:
+            t = next_goal(goals, seen, epoch, cost_so_far, current_cost) if goals else -1
+            if t < 0:
+                break
 
-        for nbr in grid.neighbors(current):
-            new_cost = current_cost + 1
-            if nbr not in cost_so_far or new_cost < cost_so_far[nbr]:
+        new_cost = current_cost + 1
+        for i in range(offsets[current], offsets[current + 1]):
+            nbr = targets[i]
+            if cell_cost is not None:
+                step = cell_cost[nbr]
+                if nbr - current == diag_step or current - nbr == diag_step:
+                    step *= diag_cost
+                new_cost = current_cost + step
+            if seen[nbr] != epoch or new_cost < cost_so_far[nbr]:
+                if track:
+                    generated += 1
+                    duplicates += seen[nbr] == epoch
+                seen[nbr] = epoch
                 cost_so_far[nbr] = new_cost
                 parent[nbr] = current
-                grid.mark_visit(nbr)
                 heapq.heappush(pq, (new_cost, nbr))
-                if nbr not in (start, goal):
-                    grid.grid[nbr] = Grid.FRONTIER
+                if gui is not None:
+                    gui.on_discover(grid, grid.node(nbr))
 
-        gui.update(pause=pause)
+        if gui is not None:
+            gui.update(pause=pause)
 
-    path = reconstruct_path(parent, start, goal)
-    if not path:
-        return []
+    if track:
+        stats.add(expanded, generated + 1, duplicates, max_frontier)
+    return state
 
-    for node in path:
-        if node not in (start, goal):
-            grid.grid[node] = Grid.PATH
-        gui.update(pause=pause)
 
-    return path
+def _ucs_buckets(
+    grid: Grid,
+    s: int,
+    t: int,
+    gui: Optional["SearchObserver"],
+    pause: float,
+    weights: Optional[StepCosts],
+    max_cost: int,
+    stats: Optional[SearchStats] = None,
+    cancel: Optional[CancelToken] = None,
+    goals: Optional[List[int]] = None,
+) -> SearchState:
+    """
+    Dial's algorithm: a circular array of ``max_cost + 1`` buckets indexed
+    by path cost.  Costs only grow, so every pending entry lies within
+    ``max_cost`` of the bucket being drained; stale entries (nodes that
+    were improved after being queued) are dropped when reached.
+    """
+    offsets, targets = grid.adjacency()
+
+    state = grid.search_state()
+    epoch = state.begin()
+    seen, parent, cost_so_far = state.seen, state.parent, state.dist
+    state.visit(s, -1, 0)
+    cell_cost, diag_step, diag_cost = _unpack(weights)
+    if cell_cost is not None:
+        cost_so_far = state.path_costs()
+        cost_so_far[s] = 0
+
+    n_buckets = max_cost + 1
+    buckets: List[List[int]] = [[] for _ in range(n_buckets)]
+    buckets[0].append(s)
+    pending = 1
+    current_cost = 0
+    track = stats is not None
+    expanded = generated = duplicates = max_frontier = 0
+
+    while pending:
+        slot = current_cost % n_buckets
+        bucket = buckets[slot]
+        if not bucket:
+            current_cost += 1
+            continue
+        # steps cost at least 1, so nothing is added to this bucket while it drains
+        buckets[slot] = []
+
+        for current in bucket:
+            if cancel is not None:
+                cancel.check()
+            if track:
+                max_frontier = max(max_frontier, pending)
+            pending -= 1
+            if cost_so_far[current] != current_cost:
+                continue  # stale entry
+            if track:
+                expanded += 1
+            if gui is not None:
+                gui.on_expand(grid, grid.node(current))
+
+            if current == t:
+                t = next_goal(goals, seen, epoch, cost_so_far, current_cost) if goals else -1
+                if t < 0:
+                    if track:
+                        stats.add(expanded, generated + 1, duplicates, max_frontier)
+                    return state
+
+            new_cost = current_cost + 1
+            for i in range(offsets[current], offsets[current + 1]):
+                nbr = targets[i]
+                if cell_cost is not None:
+                    step = cell_cost[nbr]
+                    if nbr - current == diag_step or current - nbr == diag_step:
+                        step *= diag_cost
+                    new_cost = current_cost + step
+                if seen[nbr] != epoch or new_cost < cost_so_far[nbr]:
+                    if track:
+                        generated += 1
+                        duplicates += seen[nbr] == epoch
+                    seen[nbr] = epoch
+                    cost_so_far[nbr] = new_cost
+                    parent[nbr] = current
+                    buckets[new_cost % n_buckets].append(nbr)
+                    pending += 1
+                    if gui is not None:
+                        gui.on_discover(grid, grid.node(nbr))
+
+            if gui is not None:
+                gui.update(pause=pause)
+
+        current_cost += 1
+
+    if track:
+        stats.add(expanded, generated + 1, duplicates, max_frontier)
+    return state
 
 
+def _unpack(weights: Optional[StepCosts]):
+    """(cell costs, diagonal step, diagonal factor); cell costs None = unit."""
+    if weights is None:
+        return None, 0, 1
+    return weights.cells, weights.diagonal_step, weights.diagonal_cost
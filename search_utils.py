@@ -1,13 +1,114 @@
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np  # type: ignore
 
 Node = Tuple[int, int]
 
 
-def reconstruct_path(parent: Dict[Node, Optional[Node]], start: Node, goal: Node) -> List[Node]:
+class SearchCancelled(Exception):
+    """Raised inside a search whose CancelToken was cancelled."""
+
+
+class CancelToken:
+    """
+    Stops a headless search from another thread.  Searches given one as
+    ``cancel`` check it once per expansion and raise SearchCancelled after
+    ``cancel()`` was called; the grid's search state is then left half
+    written, like after any other exception.
+    """
+
+    __slots__ = ("cancelled",)
+
+    def __init__(self) -> None:
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise SearchCancelled
+
+
+class SearchState:
+    """
+    Per-query search bookkeeping over integer cell ids, backed by
+    preallocated int32 arrays instead of per-node dicts.
+
+    ``parent[v]`` and ``dist[v]`` are only meaningful when
+    ``seen[v] == epoch``.  ``begin`` starts a new query by bumping the
+    epoch, so the arrays never need a clearing pass between queries.
+    The attributes are memoryviews, so indexing gives plain Python ints.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.parent_array = np.full(size, -1, dtype=np.int32)
+        self.dist_array = np.zeros(size, dtype=np.int32)
+        self.seen_array = np.zeros(size, dtype=np.int32)
+        self.parent = self.parent_array.data
+        self.dist = self.dist_array.data
+        self.seen = self.seen_array.data
+        self.epoch = 0
+        self.cost_array = None
+
+    def path_costs(self) -> memoryview:
+        """
+        Float64 path costs for weighted searches, allocated on first use
+        and stamped by ``seen`` like the other arrays.
+        """
+        if self.cost_array is None:
+            self.cost_array = np.zeros(self.size, dtype=np.float64)
+        return self.cost_array.data
+
+    def begin(self) -> int:
+        """Start a new query and return its epoch stamp."""
+        self.epoch += 1
+        if self.epoch == np.iinfo(np.int32).max:
+            self.seen_array.fill(0)
+            self.epoch = 1
+        return self.epoch
+
+    def visit(self, node: int, parent: int, dist: int = 0) -> None:
+        """Record ``node`` as reached from ``parent`` (-1 for the root)."""
+        self.seen[node] = self.epoch
+        self.parent[node] = parent
+        self.dist[node] = dist
+
+    def reached(self, node: int) -> bool:
+        return self.seen[node] == self.epoch
+
+
+def next_goal(goals: List[int], seen: memoryview, epoch: int, costs: memoryview, bound) -> int:
+    """
+    Retarget a sweep with several goals once it reaches its current one:
+    drop from ``goals`` every goal whose cost is final (reached at a cost
+    of at most ``bound``, the cost being expanded) and return one that is
+    still open, or -1 when they are all settled.
+    """
+    goals[:] = [g for g in goals if seen[g] != epoch or costs[g] > bound]
+    return goals[-1] if goals else -1
+
+
+def reconstruct_path(
+    parent: Union[Dict[Node, Optional[Node]], SearchState],
+    start,
+    goal,
+    cols: Optional[int] = None,
+) -> List:
     """
     Rebuild the path from start to goal using the parent dictionary
-    filled by the search algorithms.
+    filled by the search algorithms, or directly from a SearchState
+    (cell ids in, cell ids out).
+
+    When the parent links skip straight runs of cells (jump-point
+    search), pass the grid width ``cols`` with a SearchState and the
+    skipped cells are filled in one move at a time.
     """
+    if isinstance(parent, SearchState):
+        path = _reconstruct_from_state(parent, start, goal)
+        return _fill_jumps(path, cols) if cols is not None else path
+
     if goal not in parent:
         return []
 
@@ -21,3 +122,33 @@ def reconstruct_path(parent: Dict[Node, Optional[Node]], start: Node, goal: Node
 
     path.reverse()
     return path
+
+
+def _fill_jumps(path: List[int], cols: int) -> List[int]:
+    """Insert the cells between consecutive ids on a shared straight line."""
+    if not path:
+        return path
+    filled = [path[0]]
+    for a, b in zip(path, path[1:]):
+        ar, ac = divmod(a, cols)
+        br, bc = divmod(b, cols)
+        step = ((br > ar) - (br < ar)) * cols + (bc > ac) - (bc < ac)
+        filled.extend(range(a + step, b + step, step))
+    return filled
+
+
+def _reconstruct_from_state(state: SearchState, start: int, goal: int) -> List[int]:
+    if not state.reached(goal):
+        return []
+
+    parents = state.parent
+    path: List[int] = []
+    cur = goal
+    while cur >= 0:
+        path.append(cur)
+        if cur == start:
+            break
+        cur = parents[cur]
+
+    path.reverse()
+    return path
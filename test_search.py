@@ -0,0 +1,861 @@
+"""
+Seeded checks of the search engines and the tools around them on small
+random grids.  Searches are compared against plain BFS / UCS: every path
+must be legal under Grid.MOVES and as short (or as cheap) as the
+reference, or within the stated bound.
+
+    python -m pytest -q test_search.py
+"""
+
+import asyncio
+import heapq
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np  # type: ignore
+import pytest
+
+from benchmark import compare, run_case
+from grid_components import ComponentIndex
+import grid_env
+from grid_env import Grid
+from grid_generators import GENERATORS, make_grid
+from grid_io import load_grid, load_movingai, read_scenarios, save_grid
+from path_cache import PathCache
+from path_service import PathService, serve_jsonl
+from pathfinder import ALGORITHMS, find_path
+from search_batch import batch_search
+import search_bfs
+from search_dstar import DStarLite
+from search_hpa import ClusterGraph
+from search_observer import SearchObserver
+from search_parallel import ParallelSearchExecutor
+from search_recorder import SearchRecorder
+from search_stats import SearchStats, add_sink, remove_sink
+from search_stream import SearchEvent, SearchStream
+from search_utils import CancelToken
+
+Node = Tuple[int, int]
+
+DIAGONALS = ((1, 1), (-1, -1))
+# limits deep enough for every grid in this file
+DEPTHS = {"dls": {"depth_limit": 1000}, "iddfs": {"max_depth": 1000}}
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def random_grid(rng: random.Random, rows: int, cols: int, density: float,
+                costs: Optional[str] = None) -> Grid:
+    """Walls with probability ``density``; ``costs`` is None, "int" or "float"."""
+    cells = np.array(
+        [[Grid.WALL if rng.random() < density else Grid.EMPTY for _ in range(cols)]
+         for _ in range(rows)]
+    )
+    start, end = random_cell(rng, rows, cols), random_cell(rng, rows, cols)
+    cells[start] = cells[end] = Grid.EMPTY
+    grid = Grid.from_array(cells, start, end)
+    if costs == "int":
+        grid.set_costs(np.array([[rng.randint(1, 5) for _ in range(cols)] for _ in range(rows)]),
+                       diagonal_cost=2)
+    elif costs == "float":
+        grid.set_costs(np.array([[rng.random() + 0.5 for _ in range(cols)] for _ in range(rows)]),
+                       diagonal_cost=1.4)
+    return grid
+
+
+def random_cell(rng: random.Random, rows: int, cols: int) -> Node:
+    return rng.randrange(rows), rng.randrange(cols)
+
+
+def assert_legal(grid: Grid, path: List[Node], start: Node, goal: Node) -> None:
+    assert path[0] == start and path[-1] == goal
+    for a, b in zip(path, path[1:]):
+        assert (b[0] - a[0], b[1] - a[1]) in Grid.MOVES, (a, b)
+    for node in path:
+        assert grid.is_free(node), node
+
+
+def path_cost(grid: Grid, path: List[Node]) -> float:
+    """Cost of ``path`` under the grid's cost layer (its length without one)."""
+    if grid.costs is None:
+        return len(path) - 1
+    total = 0.0
+    for a, b in zip(path, path[1:]):
+        step = float(grid.costs[b])
+        if (b[0] - a[0], b[1] - a[1]) in DIAGONALS:
+            step *= grid.diagonal_cost
+        total += step
+    return total
+
+
+def reference(grid: Grid, start: Node, goal: Node, algorithm: str = "ucs") -> List[Node]:
+    grid.start, grid.end = start, goal
+    return find_path(grid, algorithm)
+
+
+def test_searches_run_without_matplotlib():
+    code = (
+        "import sys\n"
+        "sys.modules['matplotlib'] = None  # any import of it fails\n"
+        "from grid_env import Grid\n"
+        "from pathfinder import ALGORITHMS, find_path\n"
+        f"depths = {DEPTHS!r}\n"
+        "for name in ALGORITHMS:\n"
+        "    assert find_path(Grid(), name, **depths.get(name, {})), name\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=HERE, check=True)
+
+
+@pytest.mark.parametrize("algorithm", sorted(ALGORITHMS))
+def test_headless_search_matches_observed_and_leaves_grid_unmarked(algorithm):
+    rng = random.Random(1)
+    for _ in range(20):
+        grid = random_grid(rng, rng.randint(1, 20), rng.randint(1, 20), 0.25)
+        before = grid.grid.copy()
+        path = find_path(grid, algorithm, **DEPTHS.get(algorithm, {}))
+        np.testing.assert_array_equal(grid.grid, before)
+        assert path == find_path(grid, algorithm, SearchObserver(), **DEPTHS.get(algorithm, {}))
+
+
+def test_neighbour_table_matches_neighbors():
+    rng = random.Random(2)
+    for _ in range(20):
+        rows, cols = rng.randint(1, 20), rng.randint(1, 20)
+        grid = random_grid(rng, rows, cols, 0.3)
+        for q in range(3):
+            if q:
+                # the table is rebuilt after wall edits
+                cell = random_cell(rng, rows, cols)
+                grid.set_wall(cell, grid.is_free(cell))
+            offsets, targets = grid.adjacency()
+            rev_offsets, sources = grid.reverse_adjacency()
+            for v in range(rows * cols):
+                node = grid.node(v)
+                expected = list(grid.neighbors(node)) if grid.is_free(node) else []
+                assert [grid.node(u) for u in targets[offsets[v]:offsets[v + 1]]] == expected
+                for u in sources[rev_offsets[v]:rev_offsets[v + 1]]:
+                    assert v in targets[offsets[u]:offsets[u + 1]]
+            assert len(sources) == len(targets)
+
+
+def test_search_state_is_reused_across_queries_and_epoch_wraps():
+    rng = random.Random(3)
+    grid = random_grid(rng, 25, 25, 0.25)
+    state = grid.search_state()
+    state.epoch = np.iinfo(np.int32).max - 5  # wrap around during the queries
+    for _ in range(15):
+        start, goal = random_cell(rng, 25, 25), random_cell(rng, 25, 25)
+        if not (grid.is_free(start) and grid.is_free(goal)):
+            continue
+        for algorithm in ("bfs", "ucs", "bidirectional"):
+            fresh = Grid.from_array(grid.grid.copy(), start, goal)
+            assert reference(grid, start, goal, algorithm) == find_path(fresh, algorithm)
+        assert grid.search_state() is state
+    assert 0 < state.epoch < 20
+
+
+@pytest.mark.parametrize("layout", sorted(GENERATORS))
+def test_vectorized_bfs_matches_scalar_bfs(layout, monkeypatch):
+    # narrow enough that these grids switch between NumPy levels and the queue
+    monkeypatch.setattr(search_bfs, "VECTORIZE_MIN_FRONTIER", 16)
+    rng = random.Random(4)
+    for seed in range(3):
+        grid = make_grid(layout, 128, 0.3, seed)
+        # a full sweep reaches the same cells at the same distances along the same parents
+        source = grid.index(grid.start)
+        state = search_bfs.bfs_tree(grid, source, vectorize=True)
+        seen = state.seen_array == state.epoch
+        dist, parent = state.dist_array[seen], state.parent_array[seen]
+        state = search_bfs.bfs_tree(grid, source, vectorize=False)
+        np.testing.assert_array_equal(seen, state.seen_array == state.epoch)
+        np.testing.assert_array_equal(dist, state.dist_array[seen])
+        np.testing.assert_array_equal(parent, state.parent_array[seen])
+
+        for _ in range(5):
+            start, goal = random_cell(rng, 128, 128), random_cell(rng, 128, 128)
+            path = find_path(grid, "bfs", vectorize=True, start=start, goal=goal)
+            assert path == find_path(grid, "bfs", vectorize=False, start=start, goal=goal)
+
+
+@pytest.mark.parametrize("algorithm, costs", [("bfs", None), ("ucs", None), ("ucs", "int"), ("ucs", "float")])
+def test_batch_search_matches_single_queries(algorithm, costs):
+    rng = random.Random(5)
+    for _ in range(10):
+        rows, cols = rng.randint(2, 25), rng.randint(2, 25)
+        grid = random_grid(rng, rows, cols, 0.3, costs)
+        starts = [random_cell(rng, rows, cols) for _ in range(4)]
+        pairs = [(rng.choice(starts), random_cell(rng, rows, cols)) for _ in range(20)]
+        result = batch_search(grid, pairs, algorithm)
+        for start, goal in pairs:
+            ref = reference(grid, start, goal, algorithm)
+            path = result.path(start, goal)
+            if not ref:
+                assert path == [] and result.distance(start, goal) == -1
+                continue
+            assert_legal(grid, path, start, goal)
+            assert path_cost(grid, path) == pytest.approx(path_cost(grid, ref))
+            assert result.distance(start, goal) == pytest.approx(path_cost(grid, ref))
+
+    with pytest.raises(ValueError):
+        batch_search(grid, pairs, "dfs")
+
+
+@pytest.mark.parametrize("costs", [None, "int"])
+def test_parallel_executor_matches_local_searches(costs):
+    rng = random.Random(6)
+    grid = random_grid(rng, 20, 20, 0.25, costs)
+    jobs = [("ucs" if costs else "bfs", random_cell(rng, 20, 20), random_cell(rng, 20, 20))
+            for _ in range(10)]
+    jobs.append(("dls", grid.start, grid.end, DEPTHS["dls"]))
+    with ParallelSearchExecutor(grid, processes=2) as pool:
+        results = {job[:3]: path for job, path in pool.run(jobs)}
+        with pytest.raises(ValueError):
+            pool.run([("nope", grid.start, grid.end)])
+    assert len(results) == len(jobs)
+    for job in jobs:
+        algorithm, start, goal = job[:3]
+        params = job[3] if len(job) > 3 else {}
+        assert results[job[:3]] == find_path(grid, algorithm, start=start, goal=goal, **params)
+
+
+def test_clear_search_marks_restores_the_grid_after_observed_searches():
+    rng = random.Random(7)
+    for _ in range(10):
+        grid = random_grid(rng, rng.randint(2, 20), rng.randint(2, 20), 0.25)
+        expected = grid.grid.copy()
+        expected[grid.start], expected[grid.end] = Grid.START, Grid.END
+        for algorithm in ("bfs", "dfs", "ucs", "bidirectional"):
+            find_path(grid, algorithm, SearchObserver())
+            grid.clear_search_marks()
+            np.testing.assert_array_equal(grid.grid, expected)
+            # empty cells lose their visit labels and the start is first again
+            assert (grid.visit_order[grid.grid == Grid.EMPTY] == -1).all()
+            assert grid.visit_order[grid.start] == 0
+
+
+def test_complete_iddfs_finds_shortest_paths():
+    rng = random.Random(8)
+    for _ in range(30):
+        rows, cols = rng.randint(1, 15), rng.randint(1, 15)
+        grid = random_grid(rng, rows, cols, 0.25)
+        ref = reference(grid, grid.start, grid.end, "bfs")
+        stats = SearchStats()
+        path = find_path(grid, "iddfs", complete=True, max_depth=rows * cols, stats=stats)
+        if not ref:
+            assert path == []
+            continue
+        assert_legal(grid, path, grid.start, grid.end)
+        assert len(path) == len(ref)
+        # headless passes start at the move distance and stop at the goal depth
+        first = grid.move_distance(grid.start, grid.end)
+        assert sorted(stats.depth_expanded) == list(range(first, len(ref)))
+        assert sum(stats.depth_expanded.values()) == stats.expanded
+        # a limit one short of the goal finds nothing
+        assert find_path(grid, "iddfs", complete=True, max_depth=len(ref) - 2) == []
+
+
+def serpentine(rows: int, cols: int) -> Grid:
+    """A single corridor winding down the grid from (0, 0) to the last row."""
+    cells = np.full((rows, cols), Grid.EMPTY)
+    for r in range(1, rows, 2):
+        cells[r, :] = Grid.WALL
+        cells[r, cols - 1 if r % 4 == 1 else 0] = Grid.EMPTY
+    return Grid.from_array(cells, (0, 0), (rows - 1, cols - 1 if rows % 4 == 1 else 0))
+
+
+def test_depth_limited_search_runs_deeper_than_the_recursion_limit():
+    grid = serpentine(41, 80)
+    ref = reference(grid, grid.start, grid.end, "bfs")
+    assert len(ref) > sys.getrecursionlimit()
+    path = find_path(grid, "dls", depth_limit=grid.rows * grid.cols)
+    assert_legal(grid, path, grid.start, grid.end)
+    # complete passes find the goal at exactly its distance and not before
+    path = find_path(grid, "dls", depth_limit=len(ref) - 1, complete=True)
+    assert_legal(grid, path, grid.start, grid.end)
+    assert len(path) == len(ref)
+    assert find_path(grid, "dls", depth_limit=len(ref) - 2, complete=True) == []
+    assert find_path(grid, "dls", depth_limit=-1, start=grid.start, goal=grid.start) == []
+
+
+@pytest.mark.parametrize("costs", [None, "int"])
+def test_bucket_and_heap_frontiers_find_equal_costs(costs):
+    rng = random.Random(10)
+    for _ in range(20):
+        rows, cols = rng.randint(1, 20), rng.randint(1, 20)
+        grid = random_grid(rng, rows, cols, 0.25, costs)
+        bucket = find_path(grid, "ucs", frontier="bucket")
+        heap = find_path(grid, "ucs", frontier="heap")
+        assert bool(bucket) == bool(heap)
+        if bucket:
+            assert_legal(grid, bucket, grid.start, grid.end)
+            assert path_cost(grid, bucket) == path_cost(grid, heap)
+        if costs is None:
+            assert len(bucket) == len(reference(grid, grid.start, grid.end, "bfs"))
+
+
+def test_bucket_frontier_rejects_fractional_costs():
+    grid = random_grid(random.Random(10), 5, 5, 0.0, "float")
+    with pytest.raises(ValueError):
+        find_path(grid, "ucs", frontier="bucket")
+    with pytest.raises(ValueError):
+        find_path(grid, "ucs", frontier="fibonacci")
+    assert find_path(grid, "ucs")  # picks the heap by itself
+
+
+def dijkstra(grid: Grid, start: Node) -> dict:
+    """Cheapest cost from ``start`` to every reachable cell, by Grid.neighbors."""
+    best = {start: 0.0}
+    queue = [(0.0, start)]
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if cost > best[node]:
+            continue
+        for nbr in grid.neighbors(node):
+            new = cost + path_cost(grid, [node, nbr])
+            if new < best.get(nbr, float("inf")):
+                best[nbr] = new
+                heapq.heappush(queue, (new, nbr))
+    return best
+
+
+@pytest.mark.parametrize("costs", ["int", "float"])
+def test_weighted_searches_match_dijkstra(costs):
+    rng = random.Random(11)
+    for _ in range(15):
+        rows, cols = rng.randint(1, 15), rng.randint(1, 15)
+        grid = random_grid(rng, rows, cols, 0.25, costs)
+        best = dijkstra(grid, grid.start) if grid.is_free(grid.start) else {}
+        for _ in range(5):
+            goal = random_cell(rng, rows, cols)
+            for algorithm in ("ucs", "bidirectional-ucs"):
+                path = find_path(grid, algorithm, goal=goal)
+                if goal not in best:
+                    assert path == []
+                    continue
+                assert_legal(grid, path, grid.start, goal)
+                assert path_cost(grid, path) == pytest.approx(best[goal])
+
+        # new costs are picked up by the next search, unit costs again after None
+        grid.set_costs(None)
+        assert grid.step_costs() is None
+        assert len(find_path(grid, "ucs")) == len(reference(grid, grid.start, grid.end, "bfs"))
+
+
+def test_set_costs_rejects_bad_layers():
+    grid = Grid.from_array(np.zeros((3, 4), dtype=int), (0, 0), (2, 3))
+    with pytest.raises(ValueError):
+        grid.set_costs(np.ones((4, 3)))
+    with pytest.raises(ValueError):
+        grid.set_costs(np.zeros((3, 4)))
+    with pytest.raises(ValueError):
+        grid.set_costs(np.ones((3, 4)), diagonal_cost=0)
+    grid.set_costs(np.full((3, 4), 70000))
+    assert grid.costs.dtype == np.float32  # too big for uint16
+
+
+def test_bidirectional_search_matches_bfs_lengths():
+    rng = random.Random(12)
+    for _ in range(30):
+        rows, cols = rng.randint(1, 20), rng.randint(1, 20)
+        grid = random_grid(rng, rows, cols, 0.3)
+        for goal in (grid.end, grid.start, random_cell(rng, rows, cols)):
+            ref = reference(grid, grid.start, goal, "bfs")
+            stats = SearchStats()
+            path = find_path(grid, "bidirectional", goal=goal, stats=stats)
+            if not ref:
+                assert path == []
+                continue
+            assert_legal(grid, path, grid.start, goal)
+            assert len(path) == len(ref)
+            assert stats.extra["expanded_start"] + stats.extra["expanded_goal"] == stats.expanded
+        assert find_path(grid, "bidirectional", goal=grid.start) == [grid.start]
+
+
+@pytest.mark.parametrize("reuse_trees", [False, True])
+def test_path_cache_matches_find_path_and_follows_edits(reuse_trees):
+    rng = random.Random(13)
+    grid = random_grid(rng, 20, 20, 0.25)
+    endpoints = grid.start, grid.end
+    cache = PathCache(grid, maxsize=16, reuse_trees=reuse_trees)
+    starts = [random_cell(rng, 20, 20) for _ in range(3)]
+    pairs = [(rng.choice(starts), random_cell(rng, 20, 20)) for _ in range(9)]
+    wall = next(cell for cell in np.ndindex(20, 20) if not grid.is_free(cell))
+    pairs.append((wall, wall))
+    for edit in range(3):
+        if edit:
+            cell = random_cell(rng, 20, 20)
+            grid.set_wall(cell, grid.is_free(cell))
+        for _ in range(2):
+            for start, goal in pairs:
+                path = cache.find_path("bfs", start, goal)
+                ref = find_path(grid, "bfs", start=start, goal=goal)
+                if reuse_trees and ref:
+                    assert_legal(grid, path, start, goal)
+                    assert len(path) == len(ref)
+                else:
+                    assert path == ref
+        assert (grid.start, grid.end) == endpoints
+    # each layout misses every pair once and then hits it
+    assert cache.misses == cache.hits == 3 * len(pairs)
+    assert cache.info()["paths"] <= 16
+    if reuse_trees:
+        assert cache.info()["trees"] <= 8 and cache.tree_hits > 0
+
+
+@pytest.mark.parametrize("costs", [None, "int", "float"])
+def test_dstar_lite_matches_ucs_while_walls_change(costs):
+    rng = random.Random(14)
+    for _ in range(40):
+        rows, cols = rng.randint(2, 15), rng.randint(2, 15)
+        grid = random_grid(rng, rows, cols, 0.2, costs)
+        goal = grid.end
+        planner = DStarLite(grid)
+        for _ in range(12):
+            path = planner.plan()
+            start = grid.node(planner.start)
+            ref = reference(grid, start, goal)
+            assert bool(path) == bool(ref)
+            if path:
+                assert_legal(grid, path, start, goal)
+                assert path_cost(grid, path) == pytest.approx(path_cost(grid, ref))
+
+            cell = random_cell(rng, rows, cols)
+            op = rng.random()
+            if op < 0.5 and cell not in (start, goal) and grid.is_free(cell):
+                planner.add_wall(cell)
+            elif op < 0.8 and cell in grid.dynamic_walls:
+                planner.remove_wall(cell)
+            elif len(path) > 1:
+                planner.move_start(path[1])
+
+
+@pytest.mark.parametrize("costs", [None, "int"])
+def test_cluster_graph_is_legal_and_near_ucs(costs):
+    rng = random.Random(15)
+    for _ in range(20):
+        rows, cols = rng.randint(9, 50), rng.randint(9, 50)
+        grid = random_grid(rng, rows, cols, rng.choice([0.0, 0.1, 0.25, 0.35]), costs)
+        graph = ClusterGraph(grid, rng.choice([2, 3, 4, 8, 16]))
+        for q in range(10):
+            start, goal = random_cell(rng, rows, cols), random_cell(rng, rows, cols)
+            if q % 2:
+                # edit walls between queries, tracked for the graph
+                cell = random_cell(rng, rows, cols)
+                if cell not in (start, goal):
+                    grid.set_wall(cell, grid.is_free(cell))
+                    graph.cells_changed([cell])
+            for node in (start, goal):
+                if not grid.is_free(node):
+                    grid.set_wall(node, False)
+                    graph.cells_changed([node])
+            path = graph.find_path(start, goal)
+            ref = reference(grid, start, goal)
+            assert bool(path) == bool(ref)
+            if path:
+                assert_legal(grid, path, start, goal)
+                # the bound given in the search_hpa docstring, with margin
+                assert path_cost(grid, path) <= 2 * path_cost(grid, ref) + 1e-9
+
+        # incremental updates leave the same graph as a rebuild
+        fresh = ClusterGraph(grid, graph.cluster_size)
+        start, goal = grid.start, grid.end
+        assert path_cost(grid, graph.find_path(start, goal)) == pytest.approx(
+            path_cost(grid, fresh.find_path(start, goal))
+        )
+
+
+def test_cluster_graph_joins_neighbours_across_borders():
+    rng = random.Random(15)
+    grid = random_grid(rng, 40, 40, 0.3)
+    graph = ClusterGraph(grid, 8)
+    for r in range(grid.rows):
+        for c in range(grid.cols):
+            for dr, dc in Grid.MOVES:
+                a, b = (r, c), (r + dr, c + dc)
+                if grid.in_bounds(b) and grid.is_free(a) and grid.is_free(b):
+                    assert graph.find_path(a, b) == [a, b]
+
+
+def test_cluster_graph_follows_wall_edits_without_rebuilding():
+    rng = random.Random(15)
+    grid = random_grid(rng, 48, 48, 0.25)
+    graph = ClusterGraph(grid, 8)
+    rebuilds = []
+    rebuild = graph.rebuild
+    graph.rebuild = lambda: (rebuilds.append(grid.version), rebuild())
+    for _ in range(30):
+        # walls edited behind the graph's back, it must pick them up itself
+        for _ in range(3):
+            cell = random_cell(rng, 48, 48)
+            grid.set_wall(cell, grid.is_free(cell))
+        start, goal = random_cell(rng, 48, 48), random_cell(rng, 48, 48)
+        if not (grid.is_free(start) and grid.is_free(goal)):
+            continue
+        path = graph.find_path(start, goal)
+        assert path_cost(grid, path) == pytest.approx(
+            path_cost(grid, ClusterGraph(grid, 8).find_path(start, goal))
+        )
+    assert not rebuilds
+
+    grid.set_costs(np.full((48, 48), 2))
+    graph.find_path(grid.start, grid.end)
+    assert rebuilds == [grid.version]
+
+
+def test_component_index_matches_full_relabel_after_edits():
+    rng = random.Random(16)
+    for _ in range(30):
+        rows, cols = rng.randint(1, 25), rng.randint(1, 25)
+        grid = random_grid(rng, rows, cols, rng.choice([0.1, 0.3, 0.5]))
+        index = grid.components()
+        for _ in range(60):
+            cells = {random_cell(rng, rows, cols) for _ in range(rng.choice([1, 1, 1, 3]))}
+            for cell in cells:
+                grid.grid[cell] = Grid.WALL if grid.is_free(cell) else Grid.EMPTY
+            grid.walls_changed(list(cells))
+            assert grid.components() is index  # updated in place, not rebuilt
+            np.testing.assert_array_equal(index.labels, ComponentIndex(grid).labels)
+
+
+@pytest.mark.parametrize("algorithm", ["bfs", "ucs"])
+def test_jump_point_search_matches_bfs(algorithm):
+    rng = random.Random(17)
+    for _ in range(40):
+        rows, cols = rng.randint(1, 30), rng.randint(1, 30)
+        grid = random_grid(rng, rows, cols, rng.choice([0.0, 0.1, 0.25, 0.4]))
+        for q in range(8):
+            if q % 2:
+                # the jump tables must follow wall edits
+                cell = random_cell(rng, rows, cols)
+                grid.set_wall(cell, grid.is_free(cell))
+            start, goal = random_cell(rng, rows, cols), random_cell(rng, rows, cols)
+            if not (grid.is_free(start) and grid.is_free(goal)):
+                continue
+            ref = reference(grid, start, goal, "bfs")
+            path = find_path(grid, algorithm, prune=True)
+            assert bool(path) == bool(ref)
+            if path:
+                assert_legal(grid, path, start, goal)
+                assert len(path) == len(ref)
+
+
+@pytest.mark.parametrize("layout", sorted(GENERATORS))
+def test_suite_grids_are_solvable(layout):
+    densities = [0.1, 0.3, 0.45] if layout == "random" else [0.0]
+    for size in (2, 3, 8, 64, 128, 256, 1024):
+        for density in densities:
+            for seed in range(3 if size <= 256 else 1):
+                grid = make_grid(layout, size, density, seed)
+                assert grid.components().connected(grid.start, grid.end), (size, density, seed)
+                if size <= 64:
+                    path = find_path(grid, "bfs")
+                    assert_legal(grid, path, grid.start, grid.end)
+
+
+def test_benchmark_cases_and_regression_check():
+    result = run_case("bfs", "maze", 16, 0.3, 0, repeat=2, params={})
+    assert result["path_length"] == len(find_path(make_grid("maze", 16, 0.3, 0), "bfs")) - 1
+    assert result["expanded"] > 0 and len(result["times_s"]) == 2
+    assert compare({"results": [result]}, {"results": [result]}, tolerance=0.1) == []
+
+    slower = dict(result, time_s=result["time_s"] + 1.0, expanded=result["expanded"] + 1,
+                  path_length=result["path_length"] + 1)
+    regressions = compare({"results": [result]}, {"results": [slower]}, tolerance=0.1)
+    assert len(regressions) == 3
+    # cases missing from the baseline are not compared
+    other = dict(slower, seed=1)
+    assert compare({"results": [result]}, {"results": [other]}, tolerance=0.1) == []
+
+
+class ExpandCounter(SearchObserver):
+    def __init__(self):
+        self.expanded = 0
+
+    def on_expand(self, grid: Grid, node: Node) -> None:
+        self.expanded += 1
+
+
+@pytest.mark.parametrize("algorithm", sorted(ALGORITHMS))
+def test_stats_count_what_the_observer_sees(algorithm):
+    rng = random.Random(19)
+    records = []
+    add_sink(records.append)
+    try:
+        for _ in range(10):
+            grid = random_grid(rng, rng.randint(1, 15), rng.randint(1, 15), 0.25)
+            observer, stats = ExpandCounter(), SearchStats(sink=records.append)
+            path = find_path(grid, algorithm, observer, stats=stats, **DEPTHS.get(algorithm, {}))
+            assert stats.algorithm == algorithm
+            assert stats.expanded == observer.expanded
+            assert stats.path_length == (len(path) - 1 if path else None)
+            assert "render" in stats.phases
+            # both the record's own sink and the registered one got it
+            assert records[-2:] == [stats, stats]
+
+            headless = SearchStats()
+            assert find_path(grid, algorithm, stats=headless, **DEPTHS.get(algorithm, {})) == path
+            if algorithm != "iddfs":  # headless IDDFS skips the shallow passes
+                assert headless.as_dict()["expanded"] == stats.expanded
+    finally:
+        remove_sink(records.append)
+
+
+@pytest.mark.parametrize("size", [12, 40])  # with and without cell labels
+def test_gui_repaints_only_after_the_first_frame(size, monkeypatch):
+    matplotlib = pytest.importorskip("matplotlib")
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt  # type: ignore
+    from view_gui import GridGUI
+
+    grid = random_grid(random.Random(20), size, size, 0.25)
+    gui = GridGUI(grid)
+    builds = []
+    build = gui._build
+    monkeypatch.setattr(gui, "_build", lambda: builds.append(1) or build())
+    try:
+        for algorithm in ("bfs", "ucs"):
+            path = find_path(grid, algorithm, gui, pause=0)
+            assert path == find_path(grid, algorithm)
+            np.testing.assert_array_equal(gui._codes, grid.grid)
+        assert (gui._texts is not None) == (size * size <= GridGUI.LABEL_LIMIT)
+        assert builds == [1]
+    finally:
+        plt.close(gui.fig)
+
+
+@pytest.mark.parametrize("capacity", [1 << 20, 64])  # the small one folds old deltas
+def test_recorder_replays_to_the_observed_grid(capacity):
+    rng = random.Random(21)
+    for algorithm in ("bfs", "dfs", "bidirectional"):
+        grid = random_grid(rng, 15, 15, 0.25)
+        recorder = SearchRecorder(capacity)
+        path = find_path(grid, algorithm, recorder)
+        assert path == find_path(grid, algorithm)
+        assert len(recorder) <= capacity
+
+        frames = 0
+        for frame in recorder.frames():
+            frames += 1
+        np.testing.assert_array_equal(frame.grid, grid.grid)
+        np.testing.assert_array_equal(frame.visit_order, grid.visit_order)
+        assert 2 <= frames <= recorder.steps + 2
+        assert sum(1 for _ in recorder.frames(steps_per_frame=10)) < frames
+
+        with pytest.raises(ValueError):
+            recorder.on_clear(random_grid(rng, 3, 3, 0.0))
+    with pytest.raises(ValueError):
+        SearchRecorder(3)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+@pytest.mark.parametrize("costs", [None, "int", "float"])
+def test_grid_files_round_trip(packed, costs, tmp_path):
+    rng = random.Random(22)
+    grid = random_grid(rng, 17, 23, 0.3, costs)  # not a whole number of bytes
+    path = str(tmp_path / "grid.apf")
+    save_grid(grid, path, packed=packed)
+    for mmap in (True, False):
+        loaded = load_grid(path, mmap=mmap)
+        assert loaded.lean == packed
+        assert (loaded.start, loaded.end) == (grid.start, grid.end)
+        np.testing.assert_array_equal(loaded.free_mask(), grid.free_mask())
+        assert loaded.diagonal_cost == grid.diagonal_cost
+        if costs is None:
+            assert loaded.costs is None
+        else:
+            assert loaded.costs.dtype == grid.costs.dtype
+            np.testing.assert_array_equal(loaded.costs, grid.costs)
+        assert find_path(loaded, "ucs") == find_path(grid, "ucs")
+
+    with open(path, "r+b") as f:
+        f.write(b"NOTAGRID")
+    with pytest.raises(ValueError):
+        load_grid(path)
+
+
+def test_movingai_maps_and_scenarios(tmp_path):
+    lines = ["type octile", "height 3", "width 4", "map", "@.G.", ".T.S", "..W@"]
+    path = tmp_path / "tiny.map"
+    path.write_text("\r\n".join(lines) + "\r\n")
+    for lean in (False, True):
+        grid = load_movingai(str(path), lean=lean)
+        assert (grid.start, grid.end) == ((0, 1), (2, 1))
+        np.testing.assert_array_equal(
+            grid.free_mask(), [[0, 1, 1, 1], [1, 0, 1, 1], [1, 1, 0, 0]]
+        )
+    with pytest.raises(ValueError):
+        load_movingai(str(path), start=(0, 0))
+
+    path.write_text("\n".join(lines[:3] + lines[4:]))
+    with pytest.raises(ValueError):
+        load_movingai(str(path))
+
+    scen = tmp_path / "tiny.map.scen"
+    scen.write_text("version 1\n0\ttiny.map\t4\t3\t1\t0\t1\t2\t2.0\n")
+    assert read_scenarios(str(scen)) == [((0, 1), (2, 1), 2.0)]
+
+
+@pytest.mark.parametrize("algorithm", sorted(ALGORITHMS))
+def test_lean_grids_search_like_dense_ones(algorithm, monkeypatch):
+    # a few rows per block, so the neighbour tables are built in pieces
+    monkeypatch.setattr(grid_env, "ADJACENCY_BLOCK", 40)
+    rng = random.Random(23)
+    params = DEPTHS.get(algorithm, {})
+    for _ in range(10):
+        rows, cols = rng.randint(1, 20), rng.randint(1, 20)
+        dense = random_grid(rng, rows, cols, 0.3, rng.choice([None, "int"]))
+        lean = Grid.from_walls(~dense.free_mask(), dense.start, dense.end)
+        if dense.costs is not None:
+            lean.set_costs(dense.costs, dense.diagonal_cost)
+        assert lean.lean and not dense.lean
+        for edit in range(2):
+            if edit:
+                cell = random_cell(rng, rows, cols)
+                wall = dense.is_free(cell)
+                dense.set_wall(cell, wall)
+                lean.set_wall(cell, wall)
+            assert find_path(lean, algorithm, **params) == find_path(dense, algorithm, **params)
+            np.testing.assert_array_equal(lean.free_mask(), dense.free_mask())
+            for table, expected in zip(lean.adjacency(), dense.adjacency()):
+                np.testing.assert_array_equal(table, expected)
+
+
+@pytest.mark.parametrize("algorithm", sorted(ALGORITHMS))
+def test_streams_match_find_path_across_budgets(algorithm):
+    params = DEPTHS.get(algorithm, {})
+    grid = make_grid("maze", 21, 0.3, 24)
+    ref = find_path(grid, algorithm, SearchObserver(), **params)
+    observer = ExpandCounter()
+    find_path(grid, algorithm, observer, **params)
+
+    events = list(SearchStream(grid, algorithm, batch=7, **params))
+    assert events[-1] == SearchEvent("done", path=ref)
+    assert sum(e.kind == "expand" for e in events) == observer.expanded
+
+    # a small node budget suspends the stream until more is granted
+    stream = SearchStream(grid, algorithm, max_nodes=10, **params)
+    expanded = sum(e.kind == "expand" for e in stream)
+    while stream.status == "suspended":
+        assert stream.reason == "nodes"
+        stream.resume(max_nodes=10)
+        expanded += sum(e.kind == "expand" for e in stream)
+    assert stream.status == "done" and stream.path == ref
+    assert expanded == stream.expanded == observer.expanded
+
+    # breaking out only pauses
+    stream = SearchStream(grid, algorithm, batch=3, **params)
+    for _ in zip(range(5), stream):
+        pass
+    list(stream)
+    assert stream.path == ref
+
+
+def test_streams_cancel_and_release_their_threads():
+    grid = make_grid("open", 200, 0.0, 0)
+    stream = SearchStream(grid, "dfs")
+    for i, event in enumerate(stream):
+        if i == 100:
+            stream.cancel()
+    assert stream.status == "cancelled" and event.kind == "cancelled"
+    assert stream.path is None
+
+    with pytest.raises(TypeError):
+        list(SearchStream(grid, "dls", depth_limit="deep"))
+    with pytest.raises(ValueError):
+        SearchStream(grid, "nope")
+
+    # closed, exited and dropped streams all stop their search threads
+    searches = []
+    for how in ("close", "with", "drop"):
+        stream = SearchStream(grid, "dfs", batch=5)
+        next(iter(stream))
+        searches.append(stream._search)
+        if how == "close":
+            stream.close()
+        elif how == "with":
+            with stream:
+                pass
+        del stream
+    for search in searches:
+        search.thread.join(timeout=5)
+        assert not search.thread.is_alive()
+    np.testing.assert_array_equal(grid.grid, make_grid("open", 200, 0.0, 0).grid)
+
+
+def test_path_service_matches_find_path_and_coalesces():
+    rng = random.Random(25)
+    grid = random_grid(rng, 30, 30, 0.25, "int")
+    endpoints = grid.start, grid.end
+    pairs = [(random_cell(rng, 30, 30), random_cell(rng, 30, 30)) for _ in range(10)]
+
+    async def run():
+        async with PathService(grid, workers=2, max_queue=4) as service:
+            for algorithm in ("bfs", "ucs", "bidirectional-ucs"):
+                paths = await asyncio.gather(
+                    *(service.find_path(start, goal, algorithm) for start, goal in pairs)
+                )
+                for (start, goal), path in zip(pairs, paths):
+                    assert path == find_path(grid, algorithm, start=start, goal=goal)
+            # identical concurrent queries share one search
+            same = await asyncio.gather(*(service.find_path(*pairs[0], "ucs") for _ in range(5)))
+            assert all(path == same[0] for path in same)
+            return service.metrics()
+
+    metrics = asyncio.run(run())
+    assert metrics["requests"] == 3 * len(pairs) + 5
+    assert metrics["coalesced"] == 4 and metrics["errors"] == metrics["timeouts"] == 0
+    assert metrics["latency"]["count"] == metrics["requests"]
+    assert (grid.start, grid.end) == endpoints
+
+
+def test_path_service_rejects_bad_requests_and_cancels_timed_out_searches():
+    grid = make_grid("corridor", 200, 0.0, 0)  # IDDFS would take minutes here
+    bad = [((0, 0), (0, 200), "bfs", {}), ((True, 0), (0, 1), "bfs", {}),
+           ("ab", (0, 1), "bfs", {}), ((0, 0, 0), (0, 1), "bfs", {}),
+           ((0, 0), (0, 1), "astar", {}), ((0, 0), (0, 1), "bfs", {"cancel": CancelToken()})]
+
+    async def run():
+        async with PathService(grid, workers=1) as service:
+            for start, goal, algorithm, params in bad:
+                with pytest.raises(ValueError):
+                    await service.find_path(start, goal, algorithm, **params)
+            with pytest.raises(asyncio.TimeoutError):
+                await service.find_path(grid.start, grid.end, "iddfs", timeout=0.05,
+                                        max_depth=10 ** 6)
+            # the only worker is free again as soon as the search is cancelled
+            began = time.perf_counter()
+            assert await service.find_path((0, 0), (0, 1), "bfs", timeout=5) == [(0, 0), (0, 1)]
+            assert time.perf_counter() - began < 1
+            return service.metrics()
+
+    metrics = asyncio.run(run())
+    assert metrics["errors"] == len(bad) and metrics["timeouts"] == 1
+    assert metrics["requests"] == len(bad) + 2 and metrics["in_flight"] == 0
+
+
+def test_jsonl_front_end_answers_every_line():
+    grid = random_grid(random.Random(25), 10, 10, 0.2)
+    lines = [
+        {"id": 1, "start": list(grid.start), "goal": list(grid.end), "algorithm": "ucs"},
+        {"id": 2, "start": [0, 0], "goal": [0, 1], "params": {"stats": 1}},
+        {"id": 3, "start": [0, 0]},
+        {"id": 4, "op": "metrics"},
+    ]
+    reader = io.StringIO("\n".join(json.dumps(line) for line in lines) + "\n\nnot json\n")
+    writer = io.StringIO()
+
+    async def run():
+        async with PathService(grid) as service:
+            await serve_jsonl(service, reader, writer)
+
+    asyncio.run(run())
+    replies = {reply["id"]: reply for reply in map(json.loads, writer.getvalue().splitlines())}
+    assert replies[1]["path"] == [list(node) for node in find_path(grid, "ucs")]
+    assert "stats" in replies[2]["error"] and "goal" in replies[3]["error"]
+    assert replies[4]["metrics"]["requests"] >= 2
+    assert "error" in replies[None]